@@ -9,11 +9,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.models.base import Base
 # Import models to register metadata
-from app.models.finding import Finding  # noqa: F401
+from app.models.finding import Finding, FindingOccurrence, FindingDailyRollup  # noqa: F401
 from app.models.service import Service  # noqa: F401
-from app.models.jira import JiraIssue, JiraChangelogEvent  # noqa: F401
-from app.models.k8s import K8sPodSnapshot, K8sEvent  # noqa: F401
+from app.models.jira import JiraIssue, JiraChangelogEvent, JiraSyncState, JiraRawPayload, JiraStatusInterval  # noqa: F401
+from app.models.k8s import K8sPodSnapshot, K8sPodState, K8sEvent  # noqa: F401
 from app.models.remediation_action import RemediationAction  # noqa: F401
+from app.models.detector_checkpoint import DetectorCheckpoint  # noqa: F401
+from app.models.report_snapshot import ReportSnapshot  # noqa: F401
 
 config = context.config
 fileConfig(config.config_file_name)
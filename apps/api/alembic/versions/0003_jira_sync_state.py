@@ -0,0 +1,26 @@
+"""jira sync state
+
+Revision ID: 0003_jira_sync_state
+Revises: 0002_add_remediation_actions
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_jira_sync_state"
+down_revision = "0002_add_remediation_actions"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "jira_sync_state",
+        sa.Column("project_key", sa.String(), primary_key=True),
+        sa.Column("max_updated_at_jira", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_synced_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_full_sync_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table("jira_sync_state")
@@ -0,0 +1,22 @@
+"""jira content hashes
+
+Revision ID: 0004_jira_content_hash
+Revises: 0003_jira_sync_state
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_jira_content_hash"
+down_revision = "0003_jira_sync_state"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("jira_issues", sa.Column("content_hash", sa.String(), nullable=True))
+    op.add_column("jira_changelog_events", sa.Column("content_hash", sa.String(), nullable=True))
+
+def downgrade():
+    op.drop_column("jira_changelog_events", "content_hash")
+    op.drop_column("jira_issues", "content_hash")
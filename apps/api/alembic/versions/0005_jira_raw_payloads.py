@@ -0,0 +1,35 @@
+"""content-addressed jira raw payloads
+
+Revision ID: 0005_jira_raw_payloads
+Revises: 0004_jira_content_hash
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_jira_raw_payloads"
+down_revision = "0004_jira_content_hash"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "jira_raw_payloads",
+        sa.Column("hash", sa.String(), primary_key=True),
+        sa.Column("codec", sa.String(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.add_column("jira_issues", sa.Column("raw_hash", sa.String(), sa.ForeignKey("jira_raw_payloads.hash"), nullable=True))
+    op.add_column("jira_changelog_events", sa.Column("raw_hash", sa.String(), sa.ForeignKey("jira_raw_payloads.hash"), nullable=True))
+    op.create_index("ix_jira_issues_raw_hash", "jira_issues", ["raw_hash"])
+    op.create_index("ix_jira_changelog_raw_hash", "jira_changelog_events", ["raw_hash"])
+
+def downgrade():
+    op.drop_index("ix_jira_changelog_raw_hash", table_name="jira_changelog_events")
+    op.drop_index("ix_jira_issues_raw_hash", table_name="jira_issues")
+    op.drop_column("jira_changelog_events", "raw_hash")
+    op.drop_column("jira_issues", "raw_hash")
+    op.drop_table("jira_raw_payloads")
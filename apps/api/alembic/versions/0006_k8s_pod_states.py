@@ -0,0 +1,44 @@
+"""k8s pod current state + snapshot history index
+
+Revision ID: 0006_k8s_pod_states
+Revises: 0005_jira_raw_payloads
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_k8s_pod_states"
+down_revision = "0005_jira_raw_payloads"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "k8s_pod_states",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("cluster", sa.String(), nullable=True),
+        sa.Column("namespace", sa.String(), nullable=False),
+        sa.Column("pod", sa.String(), nullable=False),
+        sa.Column("node", sa.String(), nullable=True),
+        sa.Column("phase", sa.String(), nullable=True),
+        sa.Column("restart_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.Column("raw", sa.JSON(), nullable=False, server_default=sa.text("'{}'::json")),
+        sa.Column("first_seen_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_k8s_pod_states_ns", "k8s_pod_states", ["cluster", "namespace"])
+    # Serves DISTINCT ON (cluster, namespace, pod) ... ORDER BY created_at DESC ("state as of T")
+    op.create_index(
+        "ix_k8s_pod_snapshots_pod_time",
+        "k8s_pod_snapshots",
+        ["cluster", "namespace", "pod", sa.text("created_at DESC")],
+    )
+
+def downgrade():
+    op.drop_index("ix_k8s_pod_snapshots_pod_time", table_name="k8s_pod_snapshots")
+    op.drop_index("ix_k8s_pod_states_ns", table_name="k8s_pod_states")
+    op.drop_table("k8s_pod_states")
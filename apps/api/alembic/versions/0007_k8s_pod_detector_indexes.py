@@ -0,0 +1,29 @@
+"""indexes for latest-pod-per-pod detector queries
+
+Revision ID: 0007_k8s_pod_detector_indexes
+Revises: 0006_k8s_pod_states
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_k8s_pod_detector_indexes"
+down_revision = "0006_k8s_pod_states"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Live pods per namespace, most restarts first (delta mode reads k8s_pod_states)
+    op.create_index(
+        "ix_k8s_pod_states_live",
+        "k8s_pod_states",
+        ["cluster", "namespace", sa.text("restart_count DESC")],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    # Lookback window for append mode's DISTINCT ON over recent snapshots
+    op.create_index("ix_k8s_pod_snapshots_created", "k8s_pod_snapshots", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_k8s_pod_snapshots_created", table_name="k8s_pod_snapshots")
+    op.drop_index("ix_k8s_pod_states_live", table_name="k8s_pod_states")
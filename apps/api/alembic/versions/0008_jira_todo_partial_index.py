@@ -0,0 +1,25 @@
+"""partial index for backlog aging
+
+Revision ID: 0008_jira_todo_partial_index
+Revises: 0007_k8s_pod_detector_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_jira_todo_partial_index"
+down_revision = "0007_k8s_pod_detector_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        "ix_jira_issues_todo_created",
+        "jira_issues",
+        ["project_key", "created_at_jira"],
+        postgresql_where=sa.text("status_category = 'To Do'"),
+    )
+
+def downgrade():
+    op.drop_index("ix_jira_issues_todo_created", table_name="jira_issues")
@@ -0,0 +1,30 @@
+"""detector checkpoints
+
+Revision ID: 0009_detector_checkpoints
+Revises: 0008_jira_todo_partial_index
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_detector_checkpoints"
+down_revision = "0008_jira_todo_partial_index"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "detector_checkpoints",
+        sa.Column("detector", sa.String(), primary_key=True),
+        sa.Column("source", sa.String(), primary_key=True),
+        sa.Column("high_water", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_run_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_full_run_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # High-water lookups for the crashloop detector in delta mode
+    op.create_index("ix_k8s_pod_states_changed", "k8s_pod_states", ["changed_at"])
+
+def downgrade():
+    op.drop_index("ix_k8s_pod_states_changed", table_name="k8s_pod_states")
+    op.drop_table("detector_checkpoints")
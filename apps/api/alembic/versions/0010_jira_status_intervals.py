@@ -0,0 +1,49 @@
+"""jira status intervals
+
+Revision ID: 0010_jira_status_intervals
+Revises: 0009_detector_checkpoints
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_jira_status_intervals"
+down_revision = "0009_detector_checkpoints"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "jira_status_intervals",
+        sa.Column("issue_key", sa.String(), primary_key=True),
+        sa.Column("seq", sa.Integer(), primary_key=True),
+        sa.Column("project_key", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("entered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("left_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.create_index("ix_jira_status_intervals_project_entered", "jira_status_intervals", ["project_key", "entered_at"])
+    # Current status of every issue, for the stuck-issue scan
+    op.create_index(
+        "ix_jira_status_intervals_open",
+        "jira_status_intervals",
+        ["project_key", "status"],
+        postgresql_where=sa.text("left_at IS NULL"),
+    )
+    op.create_index("ix_jira_status_intervals_refreshed", "jira_status_intervals", ["refreshed_at"])
+    # Status transitions per issue, read when intervals are rebuilt
+    op.create_index(
+        "ix_jira_changelog_status_issue",
+        "jira_changelog_events",
+        ["issue_key", "created_at"],
+        postgresql_where=sa.text("field = 'status'"),
+    )
+
+def downgrade():
+    op.drop_index("ix_jira_changelog_status_issue", table_name="jira_changelog_events")
+    op.drop_index("ix_jira_status_intervals_refreshed", table_name="jira_status_intervals")
+    op.drop_index("ix_jira_status_intervals_open", table_name="jira_status_intervals")
+    op.drop_index("ix_jira_status_intervals_project_entered", table_name="jira_status_intervals")
+    op.drop_table("jira_status_intervals")
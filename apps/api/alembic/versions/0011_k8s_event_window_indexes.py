@@ -0,0 +1,29 @@
+"""k8s event window indexes
+
+Revision ID: 0011_k8s_event_window_indexes
+Revises: 0010_jira_status_intervals
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_k8s_event_window_indexes"
+down_revision = "0010_jira_status_intervals"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Event-storm windows: recent events of one type, fleet-wide or per namespace.
+    # The (namespace, type, last_timestamp) index also covers the old (namespace, type) lookups.
+    op.create_index("ix_k8s_events_type_last", "k8s_events", ["type", "last_timestamp"])
+    op.create_index("ix_k8s_events_ns_type_last", "k8s_events", ["namespace", "type", "last_timestamp"])
+    op.drop_index("ix_k8s_events_ns_type", table_name="k8s_events")
+    # High-water lookups for detector checkpoints
+    op.create_index("ix_k8s_events_ingested", "k8s_events", ["ingested_at"])
+
+def downgrade():
+    op.drop_index("ix_k8s_events_ingested", table_name="k8s_events")
+    op.create_index("ix_k8s_events_ns_type", "k8s_events", ["namespace", "type"])
+    op.drop_index("ix_k8s_events_ns_type_last", table_name="k8s_events")
+    op.drop_index("ix_k8s_events_type_last", table_name="k8s_events")
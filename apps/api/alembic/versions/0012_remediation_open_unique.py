@@ -0,0 +1,57 @@
+"""one open remediation action per finding and action type
+
+Revision ID: 0012_remediation_open_unique
+Revises: 0011_k8s_event_window_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_remediation_open_unique"
+down_revision = "0011_k8s_event_window_indexes"
+branch_labels = None
+depends_on = None
+
+OPEN = "status IN ('proposed', 'approved', 'executing')"
+
+def upgrade():
+    # Keep one open action per (finding, action type): the furthest along, then the oldest.
+    # Surplus proposals were never acted on and are dropped; surplus approved/executing ones are
+    # rejected rather than deleted so their audit trail stays.
+    op.execute(f"""
+        WITH ranked AS (
+            SELECT id, status, row_number() OVER (
+                PARTITION BY finding_id, action_type
+                ORDER BY CASE status WHEN 'executing' THEN 0 WHEN 'approved' THEN 1 ELSE 2 END, proposed_at, id
+            ) AS rank
+            FROM remediation_actions
+            WHERE {OPEN}
+        )
+        DELETE FROM remediation_actions a USING ranked r
+        WHERE a.id = r.id AND r.rank > 1 AND r.status = 'proposed'
+    """)
+    op.execute(f"""
+        WITH ranked AS (
+            SELECT id, row_number() OVER (
+                PARTITION BY finding_id, action_type
+                ORDER BY CASE status WHEN 'executing' THEN 0 WHEN 'approved' THEN 1 ELSE 2 END, proposed_at, id
+            ) AS rank
+            FROM remediation_actions
+            WHERE {OPEN}
+        )
+        UPDATE remediation_actions a
+        SET status = 'rejected', error_message = 'Duplicate of another open action for the same finding'
+        FROM ranked r
+        WHERE a.id = r.id AND r.rank > 1
+    """)
+    op.create_index(
+        "uq_remediation_actions_open",
+        "remediation_actions",
+        ["finding_id", "action_type"],
+        unique=True,
+        postgresql_where=sa.text(OPEN),
+    )
+
+def downgrade():
+    op.drop_index("uq_remediation_actions_open", table_name="remediation_actions")
@@ -0,0 +1,55 @@
+"""finding occurrences and daily rollup
+
+Revision ID: 0013_finding_occurrences
+Revises: 0012_remediation_open_unique
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_finding_occurrences"
+down_revision = "0012_remediation_open_unique"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "finding_occurrences",
+        sa.Column("finding_id", sa.String(), sa.ForeignKey("findings.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("severity", sa.Integer(), nullable=False),
+        sa.Column("service_id", sa.String(), nullable=False, server_default=""),
+        sa.Column("first_seen_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("runs", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_index("ix_finding_occurrences_day", "finding_occurrences", ["day"])
+    op.create_table(
+        "finding_daily_rollup",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("type", sa.String(), primary_key=True),
+        sa.Column("severity", sa.Integer(), primary_key=True),
+        sa.Column("service_id", sa.String(), primary_key=True, server_default=""),
+        sa.Column("findings", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # Seed from existing findings: all that is known is the day each was first and last written
+    op.execute("""
+        INSERT INTO finding_occurrences (finding_id, day, type, severity, service_id, first_seen_at, last_seen_at)
+        SELECT id, (ts AT TIME ZONE 'UTC')::date, type, severity, coalesce(service_id, ''), ts, ts
+        FROM findings, LATERAL (VALUES (created_at), (coalesce(updated_at, created_at))) AS seen(ts)
+        WHERE ts IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        INSERT INTO finding_daily_rollup (day, type, severity, service_id, findings)
+        SELECT day, type, severity, service_id, count(*)
+        FROM finding_occurrences
+        GROUP BY day, type, severity, service_id
+    """)
+
+def downgrade():
+    op.drop_table("finding_daily_rollup")
+    op.drop_index("ix_finding_occurrences_day", table_name="finding_occurrences")
+    op.drop_table("finding_occurrences")
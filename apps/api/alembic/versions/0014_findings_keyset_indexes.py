@@ -0,0 +1,29 @@
+"""findings keyset pagination indexes
+
+Revision ID: 0014_findings_keyset_indexes
+Revises: 0013_finding_occurrences
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014_findings_keyset_indexes"
+down_revision = "0013_finding_occurrences"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_findings_created_id": ["created_at", "id"],
+    "ix_findings_type_created_id": ["type", "created_at", "id"],
+    "ix_findings_severity_created_id": ["severity", "created_at", "id"],
+    "ix_findings_service_created_id": ["service_id", "created_at", "id"],
+}
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, "findings", columns)
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="findings")
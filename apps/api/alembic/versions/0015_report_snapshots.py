@@ -0,0 +1,25 @@
+"""report snapshots
+
+Revision ID: 0015_report_snapshots
+Revises: 0014_findings_keyset_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015_report_snapshots"
+down_revision = "0014_findings_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "report_snapshots",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("generated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("report_snapshots")
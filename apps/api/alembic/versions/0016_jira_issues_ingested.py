@@ -0,0 +1,23 @@
+"""jira issues ingested_at index
+
+Revision ID: 0016_jira_issues_ingested
+Revises: 0015_report_snapshots
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0016_jira_issues_ingested"
+down_revision = "0015_report_snapshots"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # High-water lookups for detector checkpoints
+    op.create_index("ix_jira_issues_ingested", "jira_issues", ["ingested_at"])
+    # backlog_aging now checkpoints on ingested_at; its old high-water mark was an updated_at_jira value
+    op.execute("DELETE FROM detector_checkpoints WHERE detector = 'backlog_aging' AND source = 'jira_issues'")
+
+def downgrade():
+    op.drop_index("ix_jira_issues_ingested", table_name="jira_issues")
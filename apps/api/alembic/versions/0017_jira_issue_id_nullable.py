@@ -0,0 +1,23 @@
+"""jira_issues.issue_id nullable
+
+Revision ID: 0017_jira_issue_id_nullable
+Revises: 0016_jira_issues_ingested
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0017_jira_issue_id_nullable"
+down_revision = "0016_jira_issues_ingested"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # CSV exports without an Issue id column no longer borrow the (synthetic) key as the id
+    op.alter_column("jira_issues", "issue_id", existing_type=sa.String(), nullable=True)
+    op.execute("UPDATE jira_issues SET issue_id = NULL WHERE issue_id = key AND key LIKE '%:csv:%'")
+
+def downgrade():
+    op.execute("UPDATE jira_issues SET issue_id = key WHERE issue_id IS NULL")
+    op.alter_column("jira_issues", "issue_id", existing_type=sa.String(), nullable=False)
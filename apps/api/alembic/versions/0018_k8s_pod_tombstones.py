@@ -0,0 +1,27 @@
+"""k8s pod snapshot tombstones
+
+Revision ID: 0018_k8s_pod_tombstones
+Revises: 0017_jira_issue_id_nullable
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0018_k8s_pod_tombstones"
+down_revision = "0017_jira_issue_id_nullable"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("k8s_pod_snapshots", sa.Column("deleted", sa.Boolean(), nullable=False, server_default=sa.false()))
+    # Pods already marked deleted get their tombstone at the time they were marked
+    op.execute(
+        "INSERT INTO k8s_pod_snapshots (id, cluster, namespace, pod, node, phase, restart_count, reason, created_at, raw, deleted) "
+        "SELECT gen_random_uuid()::text, cluster, namespace, pod, node, phase, restart_count, reason, deleted_at, '{}'::json, true "
+        "FROM k8s_pod_states WHERE deleted_at IS NOT NULL"
+    )
+
+def downgrade():
+    op.execute("DELETE FROM k8s_pod_snapshots WHERE deleted")
+    op.drop_column("k8s_pod_snapshots", "deleted")
@@ -7,6 +7,17 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "infra"
     POSTGRES_PASSWORD: str = "infra"
 
+    # Sync (psycopg2) pool, used by the write endpoints
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Async (asyncpg) pool, used by the read endpoints; per API process
+    DB_ASYNC_POOL_SIZE: int = 20
+    DB_ASYNC_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # wait for a free connection before failing the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 256  # prepared statements per asyncpg connection; 0 behind pgbouncer (transaction mode)
+    DB_COMMAND_TIMEOUT_SECONDS: float = 30.0  # per statement on the async pool; 0 = no limit
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+from typing import Optional
+from app.models.report_snapshot import ReportSnapshot
+
+async def fresh_snapshot(db, name: str, max_staleness: Optional[int] = None) -> Optional[ReportSnapshot]:
+    """
+    Report snapshot `name`, or None when there is none or it is older than
+    max_staleness seconds (the caller then computes the report live).
+    """
+    snap = await db.get(ReportSnapshot, name)
+    if snap is None:
+        return None
+    if max_staleness is not None and (datetime.now(timezone.utc) - snap.generated_at).total_seconds() > max_staleness:
+        return None
+    return snap
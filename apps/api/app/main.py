@@ -1,10 +1,18 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.core.db import async_engine
 from app.core.logging import setup_logging
 from app.routers import health, findings, services, reports, sources, actions
 
 setup_logging()
 
-app = FastAPI(title="Infra Insight MVP", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close pooled asyncpg connections cleanly on shutdown / reload
+    await async_engine.dispose()
+
+app = FastAPI(title="Infra Insight MVP", version="0.1.0", lifespan=lifespan)
 
 app.include_router(health.router, prefix="/health", tags=["health"])
 app.include_router(findings.router, prefix="/findings", tags=["findings"])
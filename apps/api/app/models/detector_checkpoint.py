@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime
+from app.models.base import Base
+
+class DetectorCheckpoint(Base):
+    """Per detector and input table: the high-water mark of input rows the detector has already evaluated."""
+    __tablename__ = "detector_checkpoints"
+    detector = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)  # input table, e.g. "jira_issues"
+    high_water = Column(DateTime(timezone=True), nullable=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_run_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, Text, UniqueConstraint
+from sqlalchemy import Column, String, Integer, Date, DateTime, JSON, Text, UniqueConstraint, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.models.base import Base
 
@@ -21,3 +21,32 @@ class Finding(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+# Keyset pagination of /findings: newest first on (created_at, id), optionally within one type / severity / service
+Index("ix_findings_created_id", Finding.created_at, Finding.id)
+Index("ix_findings_type_created_id", Finding.type, Finding.created_at, Finding.id)
+Index("ix_findings_severity_created_id", Finding.severity, Finding.created_at, Finding.id)
+Index("ix_findings_service_created_id", Finding.service_id, Finding.created_at, Finding.id)
+
+class FindingOccurrence(Base):
+    """A finding seen by at least one detector run on `day` (UTC), with the severity it had first that day."""
+    __tablename__ = "finding_occurrences"
+    finding_id = Column(String, ForeignKey("findings.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(String, nullable=False)
+    severity = Column(Integer, nullable=False)
+    service_id = Column(String, nullable=False, server_default="")  # "" = no service
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    runs = Column(Integer, nullable=False, server_default="1")
+
+Index("ix_finding_occurrences_day", FindingOccurrence.day)
+
+class FindingDailyRollup(Base):
+    """Number of distinct findings active per day, type, severity and service; maintained from finding_occurrences."""
+    __tablename__ = "finding_daily_rollup"
+    day = Column(Date, primary_key=True)
+    type = Column(String, primary_key=True)
+    severity = Column(Integer, primary_key=True)
+    service_id = Column(String, primary_key=True, server_default="")
+    findings = Column(Integer, nullable=False, server_default="0")
@@ -1,11 +1,19 @@
-from sqlalchemy import Column, String, DateTime, Integer, JSON, Text, Index
+from sqlalchemy import Column, String, DateTime, Integer, JSON, Text, Index, ForeignKey, LargeBinary
 from sqlalchemy.sql import func
 from app.models.base import Base
 
+class JiraRawPayload(Base):
+    __tablename__ = "jira_raw_payloads"
+    hash = Column(String, primary_key=True)       # sha256 of the canonical JSON
+    codec = Column(String, nullable=False)        # "zlib"
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)        # uncompressed bytes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class JiraIssue(Base):
     __tablename__ = "jira_issues"
     key = Column(String, primary_key=True)
-    issue_id = Column(String, nullable=False)
+    issue_id = Column(String, nullable=True)  # NULL for CSV rows exported without an Issue id
     project_key = Column(String, nullable=False)
     issue_type = Column(String, nullable=True)
     status = Column(String, nullable=True)
@@ -17,10 +25,19 @@ class JiraIssue(Base):
     created_at_jira = Column(DateTime(timezone=True), nullable=True)
     updated_at_jira = Column(DateTime(timezone=True), nullable=True)
     raw = Column(JSON, nullable=False, default=dict)
+    raw_hash = Column(String, ForeignKey("jira_raw_payloads.hash"), nullable=True)
+    content_hash = Column(String, nullable=True)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
 
 Index("ix_jira_issues_project", JiraIssue.project_key)
 Index("ix_jira_issues_updated", JiraIssue.updated_at_jira)
+Index("ix_jira_issues_raw_hash", JiraIssue.raw_hash)
+Index("ix_jira_issues_ingested", JiraIssue.ingested_at)
+Index(
+    "ix_jira_issues_todo_created",
+    JiraIssue.project_key, JiraIssue.created_at_jira,
+    postgresql_where=JiraIssue.status_category == "To Do",
+)
 
 class JiraChangelogEvent(Base):
     __tablename__ = "jira_changelog_events"
@@ -33,7 +50,41 @@ class JiraChangelogEvent(Base):
     from_string = Column(String, nullable=True)
     to_string = Column(String, nullable=True)
     raw = Column(JSON, nullable=False, default=dict)
+    raw_hash = Column(String, ForeignKey("jira_raw_payloads.hash"), nullable=True)
+    content_hash = Column(String, nullable=True)  # hash of the whole changelog history the item belongs to
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
 
 Index("ix_jira_changelog_issue", JiraChangelogEvent.issue_key)
 Index("ix_jira_changelog_created", JiraChangelogEvent.created_at)
+Index("ix_jira_changelog_raw_hash", JiraChangelogEvent.raw_hash)
+Index(
+    "ix_jira_changelog_status_issue",
+    JiraChangelogEvent.issue_key, JiraChangelogEvent.created_at,
+    postgresql_where=JiraChangelogEvent.field == "status",
+)
+
+class JiraSyncState(Base):
+    __tablename__ = "jira_sync_state"
+    project_key = Column(String, primary_key=True)
+    max_updated_at_jira = Column(DateTime(timezone=True), nullable=True)
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_sync_at = Column(DateTime(timezone=True), nullable=True)
+
+class JiraStatusInterval(Base):
+    """Time an issue spent in one status, derived from its status changelog; left_at is NULL for the current status."""
+    __tablename__ = "jira_status_intervals"
+    issue_key = Column(String, primary_key=True)
+    seq = Column(Integer, primary_key=True)       # 0 = status at creation, then one per transition
+    project_key = Column(String, nullable=False)
+    status = Column(String, nullable=True)
+    entered_at = Column(DateTime(timezone=True), nullable=True)
+    left_at = Column(DateTime(timezone=True), nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+Index("ix_jira_status_intervals_project_entered", JiraStatusInterval.project_key, JiraStatusInterval.entered_at)
+Index(
+    "ix_jira_status_intervals_open",
+    JiraStatusInterval.project_key, JiraStatusInterval.status,
+    postgresql_where=JiraStatusInterval.left_at.is_(None),
+)
+Index("ix_jira_status_intervals_refreshed", JiraStatusInterval.refreshed_at)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, JSON, Index
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, JSON, Index, false
 from sqlalchemy.sql import func
 from app.models.base import Base
 
@@ -14,8 +14,39 @@ class K8sPodSnapshot(Base):
     reason = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     raw = Column(JSON, nullable=False, default=dict)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false())  # tombstone: the pod was gone from here on
 
 Index("ix_k8s_pod_ns_pod", K8sPodSnapshot.namespace, K8sPodSnapshot.pod)
+Index("ix_k8s_pod_snapshots_created", K8sPodSnapshot.created_at)
+Index(
+    "ix_k8s_pod_snapshots_pod_time",
+    K8sPodSnapshot.cluster, K8sPodSnapshot.namespace, K8sPodSnapshot.pod, K8sPodSnapshot.created_at.desc(),
+)
+
+class K8sPodState(Base):
+    """Current state of each pod; k8s_pod_snapshots only gets a row when this changes (delta mode)."""
+    __tablename__ = "k8s_pod_states"
+    id = Column(String, primary_key=True)  # cluster:namespace:pod
+    cluster = Column(String, nullable=True)
+    namespace = Column(String, nullable=False)
+    pod = Column(String, nullable=False)
+    node = Column(String, nullable=True)
+    phase = Column(String, nullable=True)
+    restart_count = Column(Integer, nullable=False, default=0)
+    reason = Column(String, nullable=True)
+    raw = Column(JSON, nullable=False, default=dict)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+Index("ix_k8s_pod_states_ns", K8sPodState.cluster, K8sPodState.namespace)
+Index("ix_k8s_pod_states_changed", K8sPodState.changed_at)
+Index(
+    "ix_k8s_pod_states_live",
+    K8sPodState.cluster, K8sPodState.namespace, K8sPodState.restart_count.desc(),
+    postgresql_where=K8sPodState.deleted_at.is_(None),
+)
 
 class K8sEvent(Base):
     __tablename__ = "k8s_events"
@@ -34,4 +65,6 @@ class K8sEvent(Base):
     raw = Column(JSON, nullable=False, default=dict)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
 
-Index("ix_k8s_events_ns_type", K8sEvent.namespace, K8sEvent.type)
+Index("ix_k8s_events_type_last", K8sEvent.type, K8sEvent.last_timestamp)
+Index("ix_k8s_events_ns_type_last", K8sEvent.namespace, K8sEvent.type, K8sEvent.last_timestamp)
+Index("ix_k8s_events_ingested", K8sEvent.ingested_at)
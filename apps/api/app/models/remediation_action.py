@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, Text, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Text, ForeignKey, Enum, Index
 from sqlalchemy.sql import func
 import enum
 from app.models.base import Base
@@ -38,3 +38,12 @@ class RemediationAction(Base):
     approved_by = Column(String, nullable=True)
     executed_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# At most one open action per finding and action type; detectors re-proposing it update the proposal
+Index(
+    "uq_remediation_actions_open",
+    RemediationAction.finding_id, RemediationAction.action_type,
+    unique=True,
+    postgresql_where=RemediationAction.status.in_([ActionStatus.PROPOSED, ActionStatus.APPROVED, ActionStatus.EXECUTING]),
+)
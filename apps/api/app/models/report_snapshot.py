@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from app.models.base import Base
+
+class ReportSnapshot(Base):
+    """Precomputed response of a report endpoint, rewritten by every run_detectors commit."""
+    __tablename__ = "report_snapshots"
+    name = Column(String, primary_key=True)  # "weekly", "trends_daily"
+    payload = Column(JSON, nullable=False)
+    generated_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
 from datetime import datetime
-from app.core.db import get_db
+from app.core.db import get_db, get_async_db
 from app.models.remediation_action import RemediationAction, ActionStatus
 
 router = APIRouter(prefix="/actions", tags=["remediation"])
@@ -35,10 +36,10 @@ class ApproveActionRequest(BaseModel):
 
 
 @router.get("/", response_model=List[ActionResponse])
-def list_actions(
+async def list_actions(
     status: Optional[str] = None,
     finding_id: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all remediation actions with optional filters"""
     query = select(RemediationAction)
@@ -49,14 +50,14 @@ def list_actions(
         query = query.where(RemediationAction.finding_id == finding_id)
     
     query = query.order_by(RemediationAction.proposed_at.desc())
-    actions = db.execute(query).scalars().all()
+    actions = (await db.execute(query)).scalars().all()
     return actions
 
 
 @router.get("/{action_id}", response_model=ActionResponse)
-def get_action(action_id: str, db: Session = Depends(get_db)):
+async def get_action(action_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific remediation action"""
-    action = db.get(RemediationAction, action_id)
+    action = await db.get(RemediationAction, action_id)
     if not action:
         raise HTTPException(status_code=404, detail="Action not found")
     return action
@@ -1,14 +1,76 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.core.db import get_db
-from app.models.finding import Finding
+import base64
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, tuple_
+from app.core.db import get_async_db
+from app.core.snapshots import fresh_snapshot
+from app.models.finding import Finding, FindingDailyRollup
 
 router = APIRouter()
 
+def _as_utc(dt: datetime) -> datetime:
+    # Naive timestamps are taken as UTC, so filters don't depend on the database session's timezone
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def _encode_cursor(created_at: datetime, finding_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{finding_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, finding_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return _as_utc(datetime.fromisoformat(created_at)), finding_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Columns of a list row; evidence and remediation are only loaded for a single finding
+LIST_COLUMNS = (
+    Finding.id, Finding.type, Finding.fingerprint, Finding.severity, Finding.confidence,
+    Finding.title, Finding.summary, Finding.service_id, Finding.created_at,
+)
+
 @router.get("/")
-def list_findings(limit: int = 200, db: Session = Depends(get_db)):
-    rows = db.query(Finding).order_by(Finding.created_at.desc()).limit(limit).all()
+async def list_findings(
+    response: Response,
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    severity: Optional[int] = None,
+    max_severity: Optional[int] = None,
+    service_id: Optional[str] = None,
+    min_confidence: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest findings first, keyset-paginated on (created_at, id): pass the X-Next-Cursor header
+    of a page as `cursor` to get the next one (no header = last page).
+    """
+    q = select(*LIST_COLUMNS)
+    if type:
+        q = q.where(Finding.type == type)
+    if severity is not None:
+        q = q.where(Finding.severity == severity)
+    if max_severity is not None:
+        q = q.where(Finding.severity <= max_severity)
+    if service_id:
+        q = q.where(Finding.service_id == service_id)
+    if min_confidence is not None:
+        q = q.where(Finding.confidence >= min_confidence)
+    if since:
+        q = q.where(Finding.created_at >= _as_utc(since))
+    if until:
+        q = q.where(Finding.created_at < _as_utc(until))
+    if cursor:
+        # Seek past the last row of the previous page; served by the (..., created_at, id) indexes at any depth
+        q = q.where(tuple_(Finding.created_at, Finding.id) < _decode_cursor(cursor))
+    q = q.order_by(Finding.created_at.desc(), Finding.id.desc()).limit(limit + 1)
+    rows = (await db.execute(q)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
     return [{
         "id": r.id,
         "type": r.type,
@@ -22,8 +84,8 @@ def list_findings(limit: int = 200, db: Session = Depends(get_db)):
     } for r in rows]
 
 @router.get("/{finding_id}")
-def get_finding(finding_id: str, db: Session = Depends(get_db)):
-    r = db.query(Finding).filter(Finding.id == finding_id).first()
+async def get_finding(finding_id: str, db: AsyncSession = Depends(get_async_db)):
+    r = await db.get(Finding, finding_id)
     if not r:
         return {"error": "not_found"}
     return {
@@ -41,19 +103,38 @@ def get_finding(finding_id: str, db: Session = Depends(get_db)):
         "updated_at": r.updated_at
     }
 
+# Days covered by the "trends_daily" report snapshot (worker.tasks.report_snapshots.TREND_SNAPSHOT_DAYS)
+TREND_SNAPSHOT_DAYS = 90
+
 @router.get("/trends/daily")
-def daily_trends(days: int = 14, db: Session = Depends(get_db)):
-    # counts per day & severity for last N days
-    q = db.query(
-        func.date_trunc('day', Finding.created_at).label("day"),
-        Finding.severity,
-        func.count(Finding.id).label("count")
-    ).filter(Finding.created_at >= func.now() - func.make_interval(0, 0, 0, days))      .group_by("day", Finding.severity).order_by("day")
-
-    out = {}
-    for day, sev, cnt in q:
-        k = day.date().isoformat()
-        out.setdefault(k, {0: 0, 1: 0, 2: 0, 3: 0})
-        out[k][int(sev)] = int(cnt)
+async def daily_trends(
+    response: Response,
+    days: int = Query(14, ge=1, le=366),
+    type_: Optional[str] = Query(None, alias="type"),
+    service_id: Optional[str] = None,
+    max_staleness: Optional[int] = Query(None, ge=0, description="seconds; an older snapshot is recomputed live"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # findings active per day & severity for the last N days (UTC), from the daily rollup
+    today = datetime.now(timezone.utc).date()
+    if not type_ and service_id is None and days <= TREND_SNAPSHOT_DAYS:
+        snapshot = await fresh_snapshot(db, "trends_daily", max_staleness)
+        # A snapshot from before midnight has the wrong day range
+        if snapshot is not None and snapshot.payload and snapshot.payload[-1]["day"] == today.isoformat():
+            response.headers["X-Report-Generated-At"] = snapshot.generated_at.isoformat()
+            return snapshot.payload[-days:]
+    start = today - timedelta(days=days - 1)
+    r = FindingDailyRollup
+    q = select(r.day, r.severity, func.sum(r.findings).label("count")).where(r.day >= start)
+    if type_:
+        q = q.where(r.type == type_)
+    if service_id is not None:
+        q = q.where(r.service_id == service_id)
+    q = q.group_by(r.day, r.severity)
+
+    # Every day in the range, so quiet days show as zero instead of being skipped
+    out = {(start + timedelta(days=i)).isoformat(): {0: 0, 1: 0, 2: 0, 3: 0} for i in range(days)}
+    for day, sev, cnt in await db.execute(q):
+        out.setdefault(day.isoformat(), {0: 0, 1: 0, 2: 0, 3: 0})[int(sev)] = int(cnt)
 
     return [{"day": d, "p0": v[0], "p1": v[1], "p2": v[2], "p3": v[3]} for d, v in out.items()]
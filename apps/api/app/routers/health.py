@@ -2,5 +2,5 @@ from fastapi import APIRouter
 router = APIRouter()
 
 @router.get("/")
-def ok():
+async def ok():
     return {"status": "ok"}
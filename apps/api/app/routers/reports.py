@@ -1,16 +1,45 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.core.db import get_db
-from app.models.finding import Finding
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from app.core.db import get_async_db
+from app.core.snapshots import fresh_snapshot
+from app.models.finding import Finding, FindingDailyRollup
 
 router = APIRouter()
 
 @router.get("/weekly")
-def weekly_exec_summary(db: Session = Depends(get_db)):
-    counts = db.query(Finding.severity, func.count(Finding.id)).group_by(Finding.severity).all()
-    severity_counts = {int(sev): int(cnt) for sev, cnt in counts}
-    top = db.query(Finding).order_by(Finding.severity.asc(), Finding.created_at.desc()).limit(10).all()
+async def weekly_exec_summary(
+    response: Response,
+    max_staleness: Optional[int] = Query(None, ge=0, description="seconds; an older snapshot is recomputed live"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Normally served from the snapshot run_detectors writes with every commit
+    today = datetime.now(timezone.utc).date()
+    snapshot = await fresh_snapshot(db, "weekly", max_staleness)
+    # A snapshot from before midnight has the wrong week and would report yesterday's totals as current
+    if snapshot is not None and snapshot.generated_at.astimezone(timezone.utc).date() == today:
+        response.headers["X-Report-Generated-At"] = snapshot.generated_at.isoformat()
+        return snapshot.payload
+    # Active findings by severity per day over the last week, from the daily rollup
+    roll = FindingDailyRollup
+    since = today - timedelta(days=6)
+    rows = await db.execute(
+        select(roll.day, roll.severity, func.sum(roll.findings)).where(roll.day >= since).group_by(roll.day, roll.severity)
+    )
+    daily = {}
+    for day, sev, cnt in rows:
+        daily.setdefault(day, {})[int(sev)] = int(cnt)
+    # Totals are one day's active findings (days can't be summed: a finding is active on many), from the
+    # last complete day since today's rollup only holds the runs so far
+    as_of = max((d for d in daily if d < today), default=max(daily, default=None))
+    severity_counts = daily.get(as_of, {})
+    top = await db.execute(
+        select(Finding.id, Finding.severity, Finding.title, Finding.type)
+        .order_by(Finding.severity.asc(), Finding.created_at.desc())
+        .limit(10)
+    )
     return {
         "summary": {
             "total_findings": sum(severity_counts.values()),
@@ -19,7 +48,12 @@ def weekly_exec_summary(db: Session = Depends(get_db)):
                 "p1": severity_counts.get(1, 0),
                 "p2": severity_counts.get(2, 0),
                 "p3": severity_counts.get(3, 0)
-            }
+            },
+            "as_of": as_of.isoformat() if as_of else None,
         },
+        "daily": [
+            {"day": d.isoformat(), **{f"p{sev}": counts.get(sev, 0) for sev in range(4)}}
+            for d, counts in sorted(daily.items())
+        ],
         "top_findings": [{"id": r.id, "severity": r.severity, "title": r.title, "type": r.type} for r in top]
     }
@@ -2,5 +2,5 @@ from fastapi import APIRouter
 router = APIRouter()
 
 @router.get("/")
-def sources():
+async def sources():
     return {"jira": "configured via env", "kubernetes": "configured via env"}
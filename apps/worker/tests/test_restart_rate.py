@@ -0,0 +1,44 @@
+import numpy as np
+from worker.detectors.restart_rate import restart_rates, robust_z, workload_name
+
+HOUR = 3600.0
+NOW = 100 * HOUR
+
+def history(rows):
+    """rows: (pod, restart_count, seconds ago), already sorted by pod then time."""
+    return {
+        "cluster": np.array([None] * len(rows), dtype=object),
+        "namespace": np.array(["default"] * len(rows), dtype=object),
+        "pod": np.array([r[0] for r in rows], dtype=object),
+        "restart_count": np.array([r[1] for r in rows], dtype=np.int64),
+        "created_at": np.array([NOW - r[2] for r in rows], dtype=np.float64),
+    }
+
+def test_quiet_pod_first_change_is_measured_against_baseline_row():
+    # Delta mode: the pod sat at 5 restarts for two days, then jumped to 50 ten minutes ago.
+    # pod_history() supplies the pre-window snapshot as a baseline row ahead of the in-window one.
+    quiet = [("api-7d9f8c6b5-x7k2p", 5, 48 * HOUR), ("api-7d9f8c6b5-x7k2p", 50, 600)]
+    steady = [(f"web-{i}", i % 3, 600) for i in range(20)]
+    rates = restart_rates(history(sorted(quiet + steady, key=lambda r: (r[0], -r[2]))), NOW, HOUR, 24 * HOUR)
+
+    i = list(rates["pod"]).index("api-7d9f8c6b5-x7k2p")
+    assert rates["recent_restarts"][i] == 45
+    assert rates["baseline_rate"][i] == 0
+    z = robust_z(rates["rate"])
+    assert z[i] == z.max() and z[i] > 3.5
+
+def test_first_row_without_baseline_counts_no_restarts():
+    rates = restart_rates(history([("api-7d9f8c6b5-x7k2p", 50, 600)]), NOW, HOUR, 24 * HOUR)
+    assert rates["recent_restarts"][0] == 0
+
+def test_counter_reset_counts_as_zero():
+    rows = [("db-0", 9, 2 * HOUR), ("db-0", 1, 1800), ("db-0", 4, 600)]
+    rates = restart_rates(history(rows), NOW, HOUR, 24 * HOUR)
+    assert rates["recent_restarts"][0] == 3
+
+def test_workload_name():
+    assert workload_name("api-7d9f8c6b5-x7k2p") == "api"
+    assert workload_name("node-exporter-x7k2p") == "node-exporter"
+    assert workload_name("web-0") == "web"
+    assert workload_name("backup-28312345-q9z8x") == "backup"
+    assert workload_name("plain") == "plain"
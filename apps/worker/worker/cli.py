@@ -1,20 +1,41 @@
 import argparse
-from worker.tasks.ingest_jira import ingest_jira
+from worker.tasks.ingest_jira import ingest_jira, prune_jira_payloads, rebuild_status_intervals
+from worker.tasks.import_jira_csv import import_jira_csv
 from worker.tasks.ingest_k8s import ingest_k8s
+from worker.tasks.watch_k8s import watch_k8s
 from worker.tasks.run_detectors import run_detectors
+from worker.tasks.report_snapshots import refresh_reports
 from worker.tasks.execute_actions import execute_approved_actions
 
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument("cmd", choices=["ingest-jira", "ingest-k8s", "run-detectors", "execute-actions"])
+    p.add_argument("cmd", choices=["ingest-jira", "prune-jira-payloads", "rebuild-status-intervals", "import-jira-csv", "ingest-k8s", "watch-k8s", "run-detectors", "refresh-reports", "execute-actions"])
+    p.add_argument("--full", action="store_true", help="ingest-jira: full backfill, ignoring stored watermarks; run-detectors: ignore detector checkpoints")
+    p.add_argument("path", nargs="?", help="import-jira-csv: path to a Jira CSV export")
+    p.add_argument("--batch-size", type=int, default=10000, help="import-jira-csv: rows per COPY batch")
+    p.add_argument("--default-status", default=None, help="import-jira-csv: status for exports without a Status column")
+    p.add_argument("--project", default=None, help="rebuild-status-intervals: only this project key")
+    p.add_argument("--seconds", type=float, default=None, help="watch-k8s: stop after this many seconds (default: run until interrupted)")
     args = p.parse_args()
 
     if args.cmd == "ingest-jira":
-        print(ingest_jira.run())
+        print(ingest_jira.run(full=args.full))
+    elif args.cmd == "import-jira-csv":
+        if not args.path:
+            p.error("import-jira-csv requires a path")
+        print(import_jira_csv.run(args.path, batch_size=args.batch_size, default_status=args.default_status))
+    elif args.cmd == "prune-jira-payloads":
+        print(prune_jira_payloads.run())
+    elif args.cmd == "rebuild-status-intervals":
+        print(rebuild_status_intervals.run(project_key=args.project))
     elif args.cmd == "ingest-k8s":
         print(ingest_k8s.run())
+    elif args.cmd == "watch-k8s":
+        print(watch_k8s(max_seconds=args.seconds))
     elif args.cmd == "run-detectors":
-        print(run_detectors.run())
+        print(run_detectors.run(full=args.full))
+    elif args.cmd == "refresh-reports":
+        print(refresh_reports.run())
     elif args.cmd == "execute-actions":
         print(execute_approved_actions.run())
 
@@ -1,29 +1,150 @@
-import base64
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
 import requests
+from requests.adapters import HTTPAdapter
 from dateutil import parser as dtparser
 from worker.core.config import settings
 
-def _auth_header():
-    token = base64.b64encode(f"{settings.JIRA_EMAIL}:{settings.JIRA_API_TOKEN}".encode("utf-8")).decode("utf-8")
-    return {"Authorization": f"Basic {token}", "Accept": "application/json"}
+logger = logging.getLogger(__name__)
 
-def search_issues(jql: str, start_at: int = 0, max_results: int = 50):
+RETRY_STATUSES = {429, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_lock = threading.Lock()
+_stats = {"requests": 0, "retries": 0, "throttled": 0, "latency_ms_total": 0.0, "latency_ms_max": 0.0}
+# Minimum gap between requests; grows when Jira throttles us and decays again on success
+_pace = {"interval": 0.0, "next_at": 0.0}
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.JIRA_HTTP_POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.auth = (settings.JIRA_EMAIL, settings.JIRA_API_TOKEN)
+            s.headers.update({"Accept": "application/json"})
+            _session = s
+        return _session
+
+def get_stats():
+    with _lock:
+        out = dict(_stats)
+    out["latency_ms_avg"] = round(out["latency_ms_total"] / out["requests"], 1) if out["requests"] else 0.0
+    out["latency_ms_total"] = round(out["latency_ms_total"], 1)
+    out["latency_ms_max"] = round(out["latency_ms_max"], 1)
+    return out
+
+def reset_stats():
+    with _lock:
+        for k in _stats:
+            _stats[k] = 0
+
+def _record(latency_ms: float, retried: bool = False, throttled: bool = False):
+    with _lock:
+        _stats["requests"] += 1
+        _stats["retries"] += int(retried)
+        _stats["throttled"] += int(throttled)
+        _stats["latency_ms_total"] += latency_ms
+        _stats["latency_ms_max"] = max(_stats["latency_ms_max"], latency_ms)
+
+def _wait_for_pace():
+    with _lock:
+        now = time.monotonic()
+        delay = max(0.0, _pace["next_at"] - now)
+        _pace["next_at"] = max(now, _pace["next_at"]) + _pace["interval"]
+    if delay:
+        time.sleep(delay)
+
+def _adjust_pace(throttled: bool):
+    with _lock:
+        if throttled:
+            _pace["interval"] = min(settings.JIRA_HTTP_BACKOFF_MAX, max(_pace["interval"] * 2, 0.5))
+        else:
+            _pace["interval"] = _pace["interval"] / 2 if _pace["interval"] > 0.05 else 0.0
+
+def _retry_delay(r, attempt: int) -> float:
+    """Seconds to wait before retrying: Jira's Retry-After / X-RateLimit-Reset if given, else jittered backoff."""
+    if r is not None:
+        retry_after = r.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), settings.JIRA_HTTP_BACKOFF_MAX)
+            except ValueError:
+                pass
+        reset = parse_dt(r.headers.get("X-RateLimit-Reset"))
+        if reset:
+            if reset.tzinfo is None:
+                reset = reset.replace(tzinfo=timezone.utc)
+            return min(max(0.0, (reset - datetime.now(timezone.utc)).total_seconds()), settings.JIRA_HTTP_BACKOFF_MAX)
+    # Full jitter keeps parallel workers from retrying in lockstep
+    return random.uniform(0, min(settings.JIRA_HTTP_BACKOFF_MAX, settings.JIRA_HTTP_BACKOFF_BASE * 2 ** attempt))
+
+def _get(url: str, params: dict):
+    session = _get_session()
+    attempt = 0
+    while True:
+        _wait_for_pace()
+        r = None
+        started = time.perf_counter()
+        try:
+            r = session.get(url, params=params, timeout=60)
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        latency_ms = (time.perf_counter() - started) * 1000
+        throttled = r is not None and r.status_code == 429
+        retryable = error is not None or r.status_code in RETRY_STATUSES
+        will_retry = retryable and attempt < settings.JIRA_HTTP_MAX_RETRIES
+        _record(latency_ms, retried=will_retry, throttled=throttled)
+        _adjust_pace(throttled)
+        if not will_retry:
+            if error is not None:
+                raise error
+            return r
+        delay = _retry_delay(r, attempt)
+        logger.warning(
+            "Jira request %s (%s), retry %d/%d in %.1fs",
+            url, error or r.status_code, attempt + 1, settings.JIRA_HTTP_MAX_RETRIES, delay,
+        )
+        time.sleep(delay)
+        attempt += 1
+
+def search_issues(jql: str, next_page_token: str = None, max_results: int = 50):
     base_url = settings.JIRA_BASE_URL.rstrip('/')
     url = f"{base_url}/rest/api/3/search/jql"
     params = {
         "jql": jql,
-        "startAt": start_at,
         "maxResults": max_results,
         "expand": "changelog",
         "fields": "summary,issuetype,status,priority,assignee,reporter,created,updated,project",
     }
-    r = requests.get(url, headers=_auth_header(), params=params, timeout=60)
+    if next_page_token:
+        params["nextPageToken"] = next_page_token
+    r = _get(url, params)
     if not r.ok:
         print(f"Jira API Error: {r.status_code}")
         print(f"Response: {r.text}")
     r.raise_for_status()
     return r.json()
 
+def iter_issue_pages(jql: str, max_results: int = 50):
+    """Yield lists of issues for `jql`, following the search/jql nextPageToken cursor."""
+    token = None
+    while True:
+        page = search_issues(jql=jql, next_page_token=token, max_results=max_results)
+        issues = page.get("issues", []) or []
+        if issues:
+            yield issues
+        token = page.get("nextPageToken")
+        if not issues or page.get("isLast") or not token:
+            return
+
 def parse_dt(s):
     if not s:
         return None
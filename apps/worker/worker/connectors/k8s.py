@@ -1,22 +1,151 @@
+import json
+import logging
 from kubernetes import client, config
+from kubernetes.client.exceptions import ApiException
+from dateutil import parser as dtparser
 from worker.core.config import settings
 
-def load_client():
+logger = logging.getLogger(__name__)
+
+def get_k8s_client(context: str = None):
+    """
+    A dedicated ApiClient for one cluster. `context` names a kubeconfig context (None = the
+    kubeconfig's current context, or the in-cluster service account in incluster mode).
+    Each client carries its own configuration, so clients for different clusters can be used
+    from different threads at the same time.
+    """
     mode = (settings.K8S_MODE or "incluster").lower()
     try:
         if mode == "kubeconfig":
-            config.load_kube_config(config_file=settings.KUBECONFIG_PATH)
+            return config.new_client_from_config(config_file=settings.KUBECONFIG_PATH, context=context)
         elif mode == "incluster":
-            config.load_incluster_config()
+            cfg = client.Configuration()
+            config.load_incluster_config(client_configuration=cfg)
+            return client.ApiClient(cfg)
         else:
             print(f"Warning: Unknown K8S_MODE '{mode}'. K8s ingestion will be skipped.")
             return None
-        return client.CoreV1Api()
     except Exception as e:
-        print(f"Warning: Could not load Kubernetes config ({e}). K8s ingestion will be skipped.")
+        print(f"Warning: Could not load Kubernetes config{f' for context {context!r}' if context else ''} ({e}). K8s ingestion will be skipped.")
         return None
 
+def load_client(context: str = None):
+    api_client = get_k8s_client(context)
+    return client.CoreV1Api(api_client) if api_client else None
+
+def cluster_contexts() -> list:
+    """Kubeconfig contexts to ingest (K8S_CLUSTERS), or [None] for the single default cluster."""
+    contexts = [x.strip() for x in settings.K8S_CLUSTERS.split(",") if x.strip()]
+    return contexts or [None]
+
+def cluster_name(context: str = None):
+    """Value stored in the `cluster` column: the context name, else K8S_CLUSTER_NAME, else NULL."""
+    return context or settings.K8S_CLUSTER_NAME or None
+
+def cluster_context(cluster: str = None):
+    """Inverse of cluster_name: the context to connect to for a stored `cluster` value."""
+    contexts = cluster_contexts()
+    if len(contexts) == 1 and cluster in (None, cluster_name(contexts[0])):
+        return contexts[0]
+    if cluster not in contexts:
+        # With several clusters configured, guessing one could act on the wrong cluster
+        raise ValueError(f"Cluster {cluster!r} is not one of K8S_CLUSTERS ({settings.K8S_CLUSTERS})")
+    return cluster
+
 def namespace_filter():
     if not settings.K8S_NAMESPACE_FILTER:
         return None
     return {x.strip() for x in settings.K8S_NAMESPACE_FILTER.split(",") if x.strip()}
+
+# kind -> (cluster-wide list call, namespaced list call)
+LIST_CALLS = {
+    "pods": ("list_pod_for_all_namespaces", "list_namespaced_pod"),
+    "events": ("list_event_for_all_namespaces", "list_namespaced_event"),
+}
+
+def selectors(kind: str) -> dict:
+    """label_selector / field_selector kwargs for `kind`, evaluated by the API server."""
+    if kind == "pods":
+        label, field = settings.K8S_POD_LABEL_SELECTOR, settings.K8S_POD_FIELD_SELECTOR
+    else:
+        label, field = "", settings.K8S_EVENT_FIELD_SELECTOR
+    out = {}
+    if label:
+        out["label_selector"] = label
+    if field:
+        out["field_selector"] = field
+    return out
+
+def list_scopes(kind: str) -> list:
+    """
+    (list call name, kwargs) pairs covering `kind` for this deployment: one namespaced call per
+    namespace in K8S_NAMESPACE_FILTER, else a single cluster-wide call. Selectors are applied
+    server-side, so only matching objects are sent over the wire.
+    """
+    all_ns, namespaced = LIST_CALLS[kind]
+    ns_allow = namespace_filter()
+    if not ns_allow:
+        return [(all_ns, selectors(kind))]
+    return [(namespaced, {"namespace": ns, **selectors(kind)}) for ns in sorted(ns_allow)]
+
+def to_dict(v1, obj) -> dict:
+    """Model object -> dict in Kubernetes API JSON shape (camelCase keys, ISO timestamps)."""
+    return v1.api_client.sanitize_for_serialization(obj)
+
+def iter_list_chunks(v1, list_fn: str, limit: int = None, raw: bool = None, **kwargs):
+    """
+    Page through a list call with limit/continue, yielding (items, resource_version) per chunk.
+
+    Items are dicts in API JSON shape. In raw mode the response body is parsed with json.loads
+    instead of being deserialized into V1* models and converted back, which is both faster
+    and much lighter on memory for large clusters.
+    """
+    limit = limit if limit is not None else settings.K8S_LIST_PAGE_SIZE
+    raw = settings.K8S_LIST_RAW if raw is None else raw
+    fn = getattr(v1, list_fn)
+    token = None
+    while True:
+        params = dict(kwargs, watch=False, _request_timeout=settings.K8S_REQUEST_TIMEOUT_SECONDS)
+        if limit:
+            params["limit"] = limit
+        if token:
+            params["_continue"] = token
+        try:
+            if raw:
+                resp = fn(_preload_content=False, **params)
+                body = json.loads(resp.data)
+                items = body.get("items") or []
+                meta = body.get("metadata") or {}
+                resource_version, token = meta.get("resourceVersion"), meta.get("continue")
+            else:
+                resp = fn(**params)
+                items = [to_dict(v1, i) for i in resp.items]
+                resource_version, token = resp.metadata.resource_version, resp.metadata._continue
+        except ApiException as e:
+            # An expired continue token comes back as 410 with a token for an inconsistent
+            # (newer) snapshot; carry on from there rather than restarting a huge list
+            fresh = _expired_continue_token(e) if token else None
+            if not fresh:
+                raise
+            logger.warning("%s continue token expired, resuming from a newer snapshot", list_fn)
+            token = fresh
+            continue
+        yield items, resource_version
+        if not token:
+            return
+
+def _expired_continue_token(e: ApiException):
+    if e.status != 410 or not e.body:
+        return None
+    try:
+        return (json.loads(e.body).get("metadata") or {}).get("continue")
+    except (ValueError, AttributeError):
+        return None
+
+def parse_dt(s):
+    if not s:
+        return None
+    try:
+        return dtparser.isoparse(s)
+    except Exception:
+        return None
@@ -12,16 +12,50 @@ class Settings(BaseSettings):
     JIRA_API_TOKEN: str = ""
     JIRA_PROJECT_KEYS: str = ""
     JIRA_JQL_EXTRA: str = ""
-    JIRA_MAX_ISSUES: int = 200
+    JIRA_MAX_ISSUES: int = 0  # per-run cap for incremental syncs, 0 = no cap
+    JIRA_SYNC_OVERLAP_MINUTES: int = 10
+    JIRA_JQL_TIMEZONE: str = "UTC"  # timezone of the Jira user's profile; JQL dates are read in it
+    JIRA_PAGE_SIZE: int = 50
+    JIRA_PREFETCH_PAGES: int = 2  # pages fetched ahead of the writer
+    JIRA_HTTP_POOL_SIZE: int = 10
+    JIRA_HTTP_MAX_RETRIES: int = 6
+    JIRA_HTTP_BACKOFF_BASE: float = 1.0
+    JIRA_HTTP_BACKOFF_MAX: float = 60.0
+    JIRA_WRITE_MODE: str = "bulk"  # bulk | row (row = one statement per issue/changelog item, for debugging)
 
    # K8S_MODE: str = "incluster"
     K8S_MODE: str = "kubeconfig"
     KUBECONFIG_PATH: str = "/root/.kube/config"
-    K8S_NAMESPACE_FILTER: str = ""
-    K8S_MAX_EVENTS: int = 500
+    K8S_NAMESPACE_FILTER: str = ""  # comma-separated; when set, each namespace is listed/watched on its own
+    K8S_NAMESPACE_WORKERS: int = 4  # namespaces listed concurrently per cluster
+    K8S_POD_LABEL_SELECTOR: str = ""  # e.g. "team=payments"
+    K8S_POD_FIELD_SELECTOR: str = ""  # e.g. "status.phase!=Succeeded"
+    K8S_EVENT_FIELD_SELECTOR: str = ""  # e.g. "type=Warning"
+    K8S_CLUSTERS: str = ""  # comma-separated kubeconfig contexts to ingest; empty = current context only
+    K8S_CLUSTER_NAME: str = ""  # cluster label for the single-cluster setup (defaults to NULL)
+    K8S_CLUSTER_WORKERS: int = 4  # clusters ingested concurrently
+    K8S_REQUEST_TIMEOUT_SECONDS: float = 60.0  # per list request, so one stuck cluster cannot hang the run
+    K8S_MAX_EVENTS: int = 0  # cap on events per list scope (cluster or namespace) per run; 0 = no cap
+    K8S_LIST_PAGE_SIZE: int = 500  # items per list request (limit/continue paging)
+    K8S_SNAPSHOT_MODE: str = "delta"  # delta (history row only when a pod changes) | append (row per pod per run)
+    K8S_LIST_RAW: bool = True  # parse list responses as plain JSON instead of V1* models
+    K8S_WATCH_TIMEOUT_SECONDS: int = 300  # server-side watch timeout before the watch is re-opened
+    K8S_WATCH_RETRY_SECONDS: float = 5.0
+    K8S_WATCH_BATCH_SIZE: int = 500
+    K8S_WATCH_FLUSH_SECONDS: float = 2.0
+    K8S_WATCH_QUEUE_SIZE: int = 10000
+
+    DETECTORS_ENABLED: str = ""  # comma-separated detector names; empty = every registered detector
+    DETECTORS_DISABLED: str = ""
+    DETECTOR_CONFIG: dict = {}  # JSON, per detector, e.g. {"crashloop_restarts": {"timeout_seconds": 30}}
+    DETECTOR_WORKERS: int = 4
+    DETECTOR_TIMEOUT_SECONDS: float = 120.0
+    DETECTOR_INCREMENTAL: bool = True  # skip / narrow detector runs using detector_checkpoints
+    DETECTOR_CHECKPOINT_OVERLAP_SECONDS: int = 30
 
     BACKLOG_AGING_DAYS: int = 30
     POD_RESTART_THRESHOLD: int = 5
+    POD_SNAPSHOT_LOOKBACK_HOURS: int = 24  # append mode: pods not snapshotted within this window are treated as gone
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,9 @@
+import hashlib
+import json
+
+def canonical_json(doc) -> str:
+    return json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def content_hash(doc) -> str:
+    """SHA-256 of a JSON document, independent of key order and whitespace."""
+    return hashlib.sha256(canonical_json(doc).encode("utf-8")).hexdigest()
@@ -0,0 +1,22 @@
+"""Content-addressed storage format for raw source documents (see JiraRawPayload)."""
+import hashlib
+import json
+import zlib
+from worker.core.hashing import canonical_json
+
+CODEC = "zlib"
+
+def pack(doc) -> dict:
+    """Payload row for `doc`: its content hash plus the compressed canonical JSON."""
+    data = canonical_json(doc).encode("utf-8")
+    return {
+        "hash": hashlib.sha256(data).hexdigest(),
+        "codec": CODEC,
+        "data": zlib.compress(data),
+        "size": len(data),
+    }
+
+def unpack(codec: str, data: bytes):
+    if codec != CODEC:
+        raise ValueError(f"Unknown payload codec: {codec}")
+    return json.loads(zlib.decompress(data))
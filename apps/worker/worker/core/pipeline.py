@@ -0,0 +1,46 @@
+import queue
+import threading
+
+_DONE = object()
+
+def prefetch(iterable, depth: int = 2):
+    """Iterate `iterable` on a background thread, buffering at most `depth` items ahead of the consumer.
+
+    Lets a slow producer (network fetch) overlap with a slow consumer (database writes) while
+    keeping memory bounded. Producer errors are re-raised in the consumer; if the consumer stops
+    early the producer thread exits at its next put.
+    """
+    q = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_DONE, e))
+            return
+        put((_DONE, None))
+
+    t = threading.Thread(target=produce, name="prefetch", daemon=True)
+    t.start()
+    try:
+        while True:
+            item, error = q.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
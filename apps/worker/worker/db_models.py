@@ -1,7 +1,8 @@
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, String, Integer, DateTime, JSON, Text, UniqueConstraint, ForeignKey, Enum
+from sqlalchemy.orm import DeclarativeBase, relationship
+from sqlalchemy import Column, String, Integer, Boolean, Date, DateTime, JSON, Text, UniqueConstraint, ForeignKey, Enum, LargeBinary, false
 from sqlalchemy.sql import func
 import enum
+from worker.core.payloads import unpack
 
 class Base(DeclarativeBase):
     pass
@@ -14,10 +15,23 @@ class ActionStatus(str, enum.Enum):
     FAILED = "failed"
     REJECTED = "rejected"
 
+class JiraRawPayload(Base):
+    """Raw Jira document stored once, compressed and keyed by its content hash."""
+    __tablename__ = "jira_raw_payloads"
+    hash = Column(String, primary_key=True)
+    codec = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def document(self):
+        return unpack(self.codec, self.data)
+
 class JiraIssue(Base):
     __tablename__ = "jira_issues"
     key = Column(String, primary_key=True)
-    issue_id = Column(String, nullable=False)
+    issue_id = Column(String, nullable=True)  # NULL for CSV rows exported without an Issue id
     project_key = Column(String, nullable=False)
     issue_type = Column(String, nullable=True)
     status = Column(String, nullable=True)
@@ -29,8 +43,19 @@ class JiraIssue(Base):
     created_at_jira = Column(DateTime(timezone=True), nullable=True)
     updated_at_jira = Column(DateTime(timezone=True), nullable=True)
     raw = Column(JSON, nullable=False, default=dict)
+    raw_hash = Column(String, ForeignKey("jira_raw_payloads.hash"), nullable=True)
+    content_hash = Column(String, nullable=True)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    raw_payload = relationship(JiraRawPayload, lazy="select")
+
+    @property
+    def document(self):
+        """Issue payload (without changelog histories); falls back to rows that still embed raw JSON."""
+        if self.raw_payload is not None:
+            return self.raw_payload.document
+        return self.raw
+
 class JiraChangelogEvent(Base):
     __tablename__ = "jira_changelog_events"
     id = Column(String, primary_key=True)
@@ -42,8 +67,36 @@ class JiraChangelogEvent(Base):
     from_string = Column(String, nullable=True)
     to_string = Column(String, nullable=True)
     raw = Column(JSON, nullable=False, default=dict)
+    raw_hash = Column(String, ForeignKey("jira_raw_payloads.hash"), nullable=True)
+    content_hash = Column(String, nullable=True)  # hash of the whole changelog history the item belongs to
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    raw_payload = relationship(JiraRawPayload, lazy="select")
+
+    @property
+    def document(self):
+        """{"history": ..., "item": ...} for this event; falls back to rows that still embed raw JSON."""
+        if self.raw_payload is not None:
+            return {"history": self.raw_payload.document, "item": (self.raw or {}).get("item")}
+        return self.raw
+
+class JiraSyncState(Base):
+    __tablename__ = "jira_sync_state"
+    project_key = Column(String, primary_key=True)
+    max_updated_at_jira = Column(DateTime(timezone=True), nullable=True)
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_sync_at = Column(DateTime(timezone=True), nullable=True)
+
+class JiraStatusInterval(Base):
+    __tablename__ = "jira_status_intervals"
+    issue_key = Column(String, primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    project_key = Column(String, nullable=False)
+    status = Column(String, nullable=True)
+    entered_at = Column(DateTime(timezone=True), nullable=True)
+    left_at = Column(DateTime(timezone=True), nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class K8sPodSnapshot(Base):
     __tablename__ = "k8s_pod_snapshots"
     id = Column(String, primary_key=True)
@@ -56,6 +109,23 @@ class K8sPodSnapshot(Base):
     reason = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     raw = Column(JSON, nullable=False, default=dict)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false())  # tombstone: the pod was gone from here on
+
+class K8sPodState(Base):
+    __tablename__ = "k8s_pod_states"
+    id = Column(String, primary_key=True)
+    cluster = Column(String, nullable=True)
+    namespace = Column(String, nullable=False)
+    pod = Column(String, nullable=False)
+    node = Column(String, nullable=True)
+    phase = Column(String, nullable=True)
+    restart_count = Column(Integer, nullable=False, default=0)
+    reason = Column(String, nullable=True)
+    raw = Column(JSON, nullable=False, default=dict)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
 class K8sEvent(Base):
     __tablename__ = "k8s_events"
@@ -91,6 +161,39 @@ class Finding(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class FindingOccurrence(Base):
+    __tablename__ = "finding_occurrences"
+    finding_id = Column(String, ForeignKey("findings.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(String, nullable=False)
+    severity = Column(Integer, nullable=False)
+    service_id = Column(String, nullable=False, server_default="")
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    runs = Column(Integer, nullable=False, server_default="1")
+
+class FindingDailyRollup(Base):
+    __tablename__ = "finding_daily_rollup"
+    day = Column(Date, primary_key=True)
+    type = Column(String, primary_key=True)
+    severity = Column(Integer, primary_key=True)
+    service_id = Column(String, primary_key=True, server_default="")
+    findings = Column(Integer, nullable=False, server_default="0")
+
+class DetectorCheckpoint(Base):
+    __tablename__ = "detector_checkpoints"
+    detector = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)
+    high_water = Column(DateTime(timezone=True), nullable=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_run_at = Column(DateTime(timezone=True), nullable=True)
+
+class ReportSnapshot(Base):
+    __tablename__ = "report_snapshots"
+    name = Column(String, primary_key=True)
+    payload = Column(JSON, nullable=False)
+    generated_at = Column(DateTime(timezone=True), nullable=False)
+
 class RemediationAction(Base):
     __tablename__ = "remediation_actions"
 
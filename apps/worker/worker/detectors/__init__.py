@@ -0,0 +1,50 @@
+"""
+Detector discovery.
+
+Every module in this package is imported, so a detector only has to be decorated with
+@register to be picked up. Detectors shipped in other packages are loaded from the
+"infra_insight.detectors" entry point group (entry points may name a module or a class).
+"""
+import importlib
+import logging
+import pkgutil
+from importlib.metadata import entry_points
+from worker.core.config import settings
+from worker.detectors.base import Detector, DETECTOR_REGISTRY, register
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "infra_insight.detectors"
+
+_discovered = False
+
+def discover() -> dict:
+    global _discovered
+    if not _discovered:
+        for mod in pkgutil.iter_modules(__path__):
+            importlib.import_module(f"{__name__}.{mod.name}")
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                obj = ep.load()
+            except Exception as e:
+                logger.warning("Could not load detector entry point %s (%s)", ep.name, e)
+                continue
+            if isinstance(obj, type) and issubclass(obj, Detector):
+                register(obj)
+        _discovered = True
+    return DETECTOR_REGISTRY
+
+def _names(value: str) -> set:
+    return {x.strip() for x in value.split(",") if x.strip()}
+
+def enabled_detectors() -> dict:
+    """Registered detectors after DETECTORS_ENABLED (empty = all) and DETECTORS_DISABLED."""
+    registry = discover()
+    enabled, disabled = _names(settings.DETECTORS_ENABLED), _names(settings.DETECTORS_DISABLED)
+    return {
+        name: cls for name, cls in sorted(registry.items())
+        if (not enabled or name in enabled) and name not in disabled
+    }
+
+def detector_config(name: str) -> dict:
+    return dict(settings.DETECTOR_CONFIG.get(name) or {})
@@ -1,49 +1,59 @@
 import uuid
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import select
-from worker.detectors.base import Detector
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from worker.detectors.base import Detector, register
 from worker.core.config import settings
 from worker.db_models import JiraIssue
 
+@register
 class BacklogAgingDetector(Detector):
     name = "backlog_aging"
+    # ingested_at is restamped on every write; updated_at_jira is Jira's clock and can move backwards
+    inputs = {"jira_issues": ("ingested_at", "project_key")}
+    # Issues age into the result without being touched, so re-check everything hourly
+    full_refresh_seconds = 3600
 
-    def __init__(self, db):
-        self.db = db
+    def _query(self, cutoff):
+        # Served by the partial index ix_jira_issues_todo_created; only keys come back, never full issue rows
+        q = (
+            select(
+                JiraIssue.project_key,
+                func.count().label("count"),
+                func.array_agg(aggregate_order_by(JiraIssue.key, JiraIssue.created_at_jira)).label("issue_keys"),
+            )
+            .where(
+                JiraIssue.status_category == "To Do",
+                JiraIssue.created_at_jira != None,
+                JiraIssue.created_at_jira < cutoff,
+            )
+            .group_by(JiraIssue.project_key)
+        )
+        if self.scopes is not None:
+            q = q.where(JiraIssue.project_key.in_(self.scopes))
+        return q
 
     def run(self):
         cutoff = datetime.now(timezone.utc) - timedelta(days=settings.BACKLOG_AGING_DAYS)
-        q = select(JiraIssue).where(
-            JiraIssue.status_category == "To Do",
-            JiraIssue.created_at_jira != None,
-            JiraIssue.created_at_jira < cutoff,
-        ).limit(500)
-        issues = self.db.execute(q).scalars().all()
-        if not issues:
-            return []
-
-        buckets = {}
-        for i in issues:
-            buckets.setdefault(i.project_key, []).append(i)
 
         findings = []
-        for project_key, arr in buckets.items():
-            sample = [x.key for x in arr[:20]]
-            issue_keys = [x.key for x in arr]
+        for project_key, count, issue_keys in self.db.execute(self._query(cutoff)):
+            # Oldest first
+            sample = issue_keys[:20]
             fingerprint = f"{project_key}:todo_older_than_{settings.BACKLOG_AGING_DAYS}d"
             
             finding = {
                 "id": str(uuid.uuid4()),
                 "type": self.name,
                 "fingerprint": fingerprint,
-                "severity": 2 if len(arr) > 20 else 3,
+                "severity": 2 if count > 20 else 3,
                 "confidence": 80,
                 "service_id": None,
-                "title": f"Backlog aging in {project_key}: {len(arr)} To Do items older than {settings.BACKLOG_AGING_DAYS} days",
+                "title": f"Backlog aging in {project_key}: {count} To Do items older than {settings.BACKLOG_AGING_DAYS} days",
                 "summary": "Stale tickets in To Do suggest triage debt and unclear prioritisation.",
                 "evidence": {
                     "rule": f"status_category == 'To Do' AND created_at < now-{settings.BACKLOG_AGING_DAYS}d",
-                    "count": len(arr),
+                    "count": count,
                     "sample_issue_keys": sample
                 },
                 "remediation": {
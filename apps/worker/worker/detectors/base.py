@@ -1,9 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 class Detector(ABC):
     name: str
+    # Defaults for this detector's entry in DETECTOR_CONFIG (e.g. {"timeout_seconds": 30})
+    default_config: Dict[str, Any] = {}
+    # Input tables: {table: (high-water column, scope column)}. A detector with inputs is skipped
+    # when none of them changed since its checkpoint, and otherwise only re-evaluates the scopes
+    # (projects, namespaces, ...) that did change. No inputs = always a full run.
+    inputs: Dict[str, Tuple[str, str]] = {}
+    # Detectors whose result also depends on the clock (aging, lookback windows) need a full run
+    # at least this often even without new input; 0 = never forced
+    full_refresh_seconds: int = 0
+
+    def __init__(self, db, config: Dict[str, Any] = None, scopes: Optional[Set[str]] = None):
+        self.db = db
+        self.config = {**self.default_config, **(config or {})}
+        # None = evaluate everything
+        self.scopes = scopes
 
     @abstractmethod
     def run(self) -> List[Dict[str, Any]]:
         raise NotImplementedError
+
+# Registry of detectors, filled by @register (see worker.detectors.discover)
+DETECTOR_REGISTRY: Dict[str, type] = {}
+
+def register(cls):
+    DETECTOR_REGISTRY[cls.name] = cls
+    return cls
@@ -0,0 +1,77 @@
+"""
+Change checkpoints for incremental detector runs.
+
+For every input a detector declares, detector_checkpoints stores the high-water mark of the
+rows it has evaluated. A run compares that with the table's current maximum: no change means
+the detector is skipped, otherwise only the scopes of rows above the mark are re-evaluated.
+The marks are written in the same transaction as the findings they produced.
+"""
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, func, table, column
+from sqlalchemy.dialects.postgresql import insert
+from worker.core.config import settings
+from worker.db_models import DetectorCheckpoint
+
+def _load(db, detector: str) -> dict:
+    rows = db.execute(select(DetectorCheckpoint).where(DetectorCheckpoint.detector == detector)).scalars().all()
+    return {r.source: r for r in rows}
+
+def plan(db, cls, config: dict, full: bool = False) -> dict:
+    """
+    Decide how to run `cls`: {"mode": "full" | "incremental" | "skip", "scopes": set | None, "marks": {source: high_water}}.
+    """
+    inputs = cls.inputs
+    if not inputs or not settings.DETECTOR_INCREMENTAL:
+        return {"mode": "full", "scopes": None, "marks": {}}
+    checkpoints = _load(db, cls.name)
+    refresh = int(config.get("full_refresh_seconds", cls.full_refresh_seconds))
+    now = datetime.now(timezone.utc)
+    last_full = min((c.last_full_run_at for c in checkpoints.values() if c.last_full_run_at), default=None)
+    if refresh and (last_full is None or now - last_full >= timedelta(seconds=refresh)):
+        full = True
+
+    marks, scopes = {}, set()
+    for source, (wm_col, scope_col) in inputs.items():
+        t = table(source, column(wm_col), column(scope_col))
+        wm, scope = t.c[wm_col], t.c[scope_col]
+        marks[source] = db.scalar(select(func.max(wm)))
+        cp = checkpoints.get(source)
+        if full or cp is None:
+            full = True
+            continue
+        if marks[source] is None:
+            continue  # empty table
+        if cp.high_water is None:
+            full = True  # first rows since the checkpoint was taken
+            continue
+        if marks[source] <= cp.high_water:
+            continue
+        # Rows are stamped with now() at transaction start, so one committed slightly later can
+        # carry an earlier timestamp than the mark; the overlap re-reads that window
+        since = cp.high_water - timedelta(seconds=settings.DETECTOR_CHECKPOINT_OVERLAP_SECONDS)
+        scopes.update(s for s in db.scalars(select(scope).where(wm > since).distinct()) if s is not None)
+
+    if full:
+        return {"mode": "full", "scopes": None, "marks": marks}
+    if not scopes:
+        return {"mode": "skip", "scopes": set(), "marks": marks}
+    return {"mode": "incremental", "scopes": scopes, "marks": marks}
+
+def save(db, detector: str, mode: str, marks: dict):
+    if not marks:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"detector": detector, "source": source, "high_water": hw, "last_run_at": now,
+         "last_full_run_at": now if mode == "full" else None}
+        for source, hw in marks.items()
+    ]
+    stmt = insert(DetectorCheckpoint.__table__)
+    update_cols = {
+        # Never move a mark backwards (e.g. after rows were pruned)
+        "high_water": func.greatest(DetectorCheckpoint.__table__.c.high_water, stmt.excluded.high_water),
+        "last_run_at": stmt.excluded.last_run_at,
+    }
+    if mode == "full":
+        update_cols["last_full_run_at"] = stmt.excluded.last_full_run_at
+    db.execute(stmt.on_conflict_do_update(index_elements=["detector", "source"], set_=update_cols), rows)
@@ -1,40 +1,68 @@
 import uuid
-from sqlalchemy import select, desc
-from worker.detectors.base import Detector
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, func, or_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from worker.detectors.base import Detector, register
 from worker.core.config import settings
-from worker.db_models import K8sPodSnapshot
+from worker.queries.k8s import latest_pods
 
+TOP_PODS = 20
+
+@register
 class CrashLoopRestartsDetector(Detector):
     name = "crashloop_restarts"
+    # Delta mode stamps state changes (and deletions) in k8s_pod_states.changed_at; append mode
+    # only writes snapshots
+    inputs = {
+        "k8s_pod_states": ("changed_at", "namespace"),
+        "k8s_pod_snapshots": ("created_at", "namespace"),
+    }
+    # Append mode's lookback window moves with the clock
+    full_refresh_seconds = 3600
 
-    def __init__(self, db):
-        self.db = db
+    def _query(self):
+        since = datetime.now(timezone.utc) - timedelta(hours=settings.POD_SNAPSHOT_LOOKBACK_HOURS)
+        pods = latest_pods(since)
+        crashloop = pods.c.reason == "CrashLoopBackOff"
+        bad = (
+            select(
+                pods,
+                func.row_number().over(
+                    partition_by=(pods.c.cluster, pods.c.namespace), order_by=pods.c.restart_count.desc()
+                ).label("rank"),
+            )
+            .where(or_(crashloop, pods.c.restart_count >= settings.POD_RESTART_THRESHOLD))
+        )
+        if self.scopes is not None:
+            bad = bad.where(pods.c.namespace.in_(self.scopes))
+        bad = bad.subquery("bad")
+        crashloop = bad.c.reason == "CrashLoopBackOff"
+        sample = func.json_build_object("pod", bad.c.pod, "restarts", bad.c.restart_count, "reason", bad.c.reason)
+        # One row per (cluster, namespace); only the aggregates and the top-N sample leave the database
+        return (
+            select(
+                bad.c.cluster,
+                bad.c.namespace,
+                func.count().label("count"),
+                func.bool_or(crashloop).label("any_crashloop"),
+                func.json_agg(aggregate_order_by(sample, bad.c.rank)).filter(bad.c.rank <= TOP_PODS).label("top_pods"),
+                func.array_agg(bad.c.pod).filter(crashloop).label("crashloop_pods"),
+            )
+            .group_by(bad.c.cluster, bad.c.namespace)
+        )
 
     def run(self):
-        q = select(K8sPodSnapshot).order_by(desc(K8sPodSnapshot.created_at)).limit(5000)
-        pods = self.db.execute(q).scalars().all()
-        if not pods:
-            return []
+        findings = []
+        for row in self.db.execute(self._query()):
+            ns = row.namespace
+            where = f"{row.cluster}/{ns}" if row.cluster else ns
 
-        bad = [p for p in pods if p.reason == "CrashLoopBackOff" or (p.restart_count or 0) >= settings.POD_RESTART_THRESHOLD]
-        if not bad:
-            return []
+            # Build remediation action params
+            pods_to_restart = [{"name": pod, "namespace": ns} for pod in row.crashloop_pods or []]
 
-        by_ns = {}
-        for p in bad:
-            by_ns.setdefault(p.namespace, []).append(p)
+            fingerprint = f"{row.cluster}:{ns}:pod_restarts_or_crashloop" if row.cluster else f"{ns}:pod_restarts_or_crashloop"
+            sev = 1 if row.any_crashloop else 2
 
-        findings = []
-        for ns, arr in by_ns.items():
-            arr_sorted = sorted(arr, key=lambda x: (x.restart_count or 0), reverse=True)
-            sample = [{"pod": x.pod, "restarts": x.restart_count, "reason": x.reason} for x in arr_sorted[:20]]
-            
-            # Build remediation action params
-            pods_to_restart = [{"name": x.pod, "namespace": x.namespace} for x in arr if x.reason == "CrashLoopBackOff"]
-            
-            fingerprint = f"{ns}:pod_restarts_or_crashloop"
-            sev = 1 if any(x.reason == "CrashLoopBackOff" for x in arr) else 2
-            
             finding = {
                 "id": str(uuid.uuid4()),
                 "type": self.name,
@@ -42,12 +70,12 @@ class CrashLoopRestartsDetector(Detector):
                 "severity": sev,
                 "confidence": 85,
                 "service_id": None,
-                "title": f"Kubernetes instability in {ns}: {len(arr)} pods restarting / CrashLoopBackOff",
+                "title": f"Kubernetes instability in {where}: {row.count} pods restarting / CrashLoopBackOff",
                 "summary": "Frequent restarts usually indicate failing containers, bad config, or insufficient resources.",
                 "evidence": {
                     "rule": f"reason == CrashLoopBackOff OR restart_count >= {settings.POD_RESTART_THRESHOLD}",
-                    "count": len(arr),
-                    "top_pods": sample
+                    "count": row.count,
+                    "top_pods": row.top_pods or []
                 },
                 "remediation": {
                     "steps": [
@@ -58,17 +86,18 @@ class CrashLoopRestartsDetector(Detector):
                     ]
                 }
             }
-            
+
             # Add action if there are crashloop pods
             if pods_to_restart:
                 finding["proposed_action"] = {
                     "action_type": "restart_pods",
-                    "title": f"Restart {len(pods_to_restart)} CrashLoopBackOff pods in {ns}",
+                    "title": f"Restart {len(pods_to_restart)} CrashLoopBackOff pods in {where}",
                     "description": f"Delete and recreate pods stuck in CrashLoopBackOff to attempt recovery",
                     "params": {
+                        "cluster": row.cluster,
                         "pods": pods_to_restart
                     }
                 }
-            
+
             findings.append(finding)
         return findings
@@ -0,0 +1,177 @@
+import uuid
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, func, and_, cast, Float
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from worker.detectors.base import Detector, register
+from worker.db_models import JiraStatusInterval
+
+def _hours(delta):
+    return cast(func.extract("epoch", delta), Float) / 3600
+
+def _status_in(col, statuses):
+    return func.lower(col).in_([s.lower() for s in statuses])
+
+@register
+class CycleTimeDetector(Detector):
+    """
+    Cycle-time regressions and issues stuck in an active status, per project, read from
+    jira_status_intervals.
+
+    Cycle time runs from the first active status to the done status an issue is in now. The
+    p50/p85 of issues finished in the last window_days is compared with those finished in the
+    baseline before it. An issue is stuck when its current active interval is older than the
+    p85 of finished intervals in that status (and at least stuck_min_hours).
+    """
+    name = "cycle_time"
+    default_config = {
+        "active_statuses": ["In Progress", "In Review"],
+        "done_statuses": ["Done", "Closed", "Resolved"],
+        "window_days": 14,
+        "baseline_days": 90,
+        "regression_factor": 1.5,
+        "min_sample": 5,
+        "stuck_percentile": 0.85,
+        "stuck_min_hours": 72,
+    }
+    inputs = {"jira_status_intervals": ("refreshed_at", "project_key")}
+    # Open intervals age and the rolling window moves without new input
+    full_refresh_seconds = 3600
+
+    def _scoped(self, q, col):
+        return q.where(col.in_(self.scopes)) if self.scopes is not None else q
+
+    def _cycle_times(self, since):
+        s = JiraStatusInterval
+        done = self._scoped(
+            select(s.project_key, s.issue_key, s.entered_at.label("done_at"))
+            .where(s.left_at.is_(None), _status_in(s.status, self.config["done_statuses"]), s.entered_at >= since),
+            s.project_key,
+        ).subquery("done")
+        a = JiraStatusInterval.__table__.alias("a")
+        started = (
+            select(func.min(a.c.entered_at))
+            .where(a.c.issue_key == done.c.issue_key, _status_in(a.c.status, self.config["active_statuses"]))
+            .scalar_subquery()
+        )
+        q = select(done.c.project_key, done.c.done_at, _hours(done.c.done_at - started).label("hours")).subquery("cycle")
+        return select(q).where(q.c.hours.isnot(None), q.c.hours >= 0).subquery("cycle_times")
+
+    def _regressions(self, now):
+        c = self._cycle_times(now - timedelta(days=self.config["baseline_days"]))
+        recent = c.c.done_at >= now - timedelta(days=self.config["window_days"])
+        pct = lambda p, cond: func.percentile_cont(p).within_group(c.c.hours).filter(cond)
+        q = select(
+            c.c.project_key,
+            func.count().filter(recent).label("recent_n"),
+            pct(0.5, recent).label("recent_p50"),
+            pct(0.85, recent).label("recent_p85"),
+            func.count().filter(~recent).label("baseline_n"),
+            pct(0.5, ~recent).label("baseline_p50"),
+            pct(0.85, ~recent).label("baseline_p85"),
+        ).group_by(c.c.project_key)
+        return self.db.execute(q).all()
+
+    def _stuck(self, now):
+        s = JiraStatusInterval
+        active = _status_in(s.status, self.config["active_statuses"])
+        floor = float(self.config["stuck_min_hours"])
+        baseline = now - timedelta(days=self.config["baseline_days"])
+        th = self._scoped(
+            select(
+                s.project_key, s.status,
+                func.percentile_cont(self.config["stuck_percentile"]).within_group(_hours(s.left_at - s.entered_at)).label("p"),
+            )
+            .where(active, s.left_at.isnot(None), s.left_at >= baseline)
+            .group_by(s.project_key, s.status),
+            s.project_key,
+        ).subquery("th")
+        threshold = func.greatest(func.coalesce(th.c.p, floor), floor)
+        age = _hours(now - s.entered_at)
+        # Served by the partial index ix_jira_status_intervals_open
+        q = self._scoped(
+            select(
+                s.project_key, s.status, threshold.label("threshold_hours"), func.count().label("count"),
+                func.max(age).label("max_hours"),
+                func.array_agg(aggregate_order_by(s.issue_key, s.entered_at)).label("issue_keys"),
+            )
+            .select_from(s.__table__.outerjoin(th, and_(th.c.project_key == s.project_key, th.c.status == s.status)))
+            .where(s.left_at.is_(None), active, age > threshold)
+            .group_by(s.project_key, s.status, threshold),
+            s.project_key,
+        )
+        return self.db.execute(q).all()
+
+    def run(self):
+        now = datetime.now(timezone.utc)
+        cfg = self.config
+        findings = []
+
+        for r in self._regressions(now):
+            if r.recent_n < cfg["min_sample"] or r.baseline_n < cfg["min_sample"]:
+                continue
+            ratio50 = r.recent_p50 / r.baseline_p50 if r.baseline_p50 else 0.0
+            ratio85 = r.recent_p85 / r.baseline_p85 if r.baseline_p85 else 0.0
+            if max(ratio50, ratio85) < cfg["regression_factor"]:
+                continue
+            findings.append({
+                "id": str(uuid.uuid4()),
+                "type": self.name,
+                "fingerprint": f"{r.project_key}:cycle_time_regression",
+                "severity": 2 if max(ratio50, ratio85) >= 2 * cfg["regression_factor"] else 3,
+                "confidence": 80 if min(r.recent_n, r.baseline_n) >= 4 * cfg["min_sample"] else 60,
+                "service_id": None,
+                "title": f"Cycle time regression in {r.project_key}: p50 {r.recent_p50:.0f}h vs {r.baseline_p50:.0f}h baseline",
+                "summary": "Work is taking noticeably longer from start to done than it used to.",
+                "evidence": {
+                    "rule": f"p50 or p85 of cycle time over the last {cfg['window_days']}d >= {cfg['regression_factor']}x the {cfg['baseline_days']}d baseline",
+                    "recent": {"count": r.recent_n, "p50_hours": round(r.recent_p50, 1), "p85_hours": round(r.recent_p85, 1)},
+                    "baseline": {"count": r.baseline_n, "p50_hours": round(r.baseline_p50, 1), "p85_hours": round(r.baseline_p85, 1)},
+                    "ratio_p50": round(ratio50, 2),
+                    "ratio_p85": round(ratio85, 2),
+                },
+                "remediation": {
+                    "steps": [
+                        "Check WIP per person and limit parallel work.",
+                        "Look for review or QA queues in the status breakdown.",
+                        "Split large tickets before they are started.",
+                    ]
+                },
+            })
+
+        stuck = {}
+        for r in self._stuck(now):
+            stuck.setdefault(r.project_key, []).append(r)
+        for project_key, rows in stuck.items():
+            count = sum(r.count for r in rows)
+            findings.append({
+                "id": str(uuid.uuid4()),
+                "type": self.name,
+                "fingerprint": f"{project_key}:stuck_in_progress",
+                "severity": 2 if count > 10 else 3,
+                "confidence": 75,
+                "service_id": None,
+                "title": f"{count} issues stuck in {' / '.join(r.status for r in rows)} in {project_key}",
+                "summary": "Issues have been in an active status far longer than is usual for this project.",
+                "evidence": {
+                    "rule": f"time in current status > p{cfg['stuck_percentile'] * 100:.0f} of finished intervals (min {cfg['stuck_min_hours']}h)",
+                    "count": count,
+                    "statuses": [
+                        {
+                            "status": r.status,
+                            "count": r.count,
+                            "threshold_hours": round(r.threshold_hours, 1),
+                            "max_hours": round(r.max_hours, 1),
+                            # Longest stuck first
+                            "sample_issue_keys": r.issue_keys[:20],
+                        }
+                        for r in rows
+                    ],
+                },
+                "remediation": {
+                    "steps": [
+                        "Review stuck issues at stand-up and unblock or split them.",
+                        "Move abandoned work back to To Do instead of leaving it in progress.",
+                    ]
+                },
+            })
+        return findings
@@ -0,0 +1,166 @@
+import uuid
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, func, case, cast, and_, Float
+from worker.detectors.base import Detector, register
+from worker.db_models import K8sEvent
+from worker.detectors.restart_rate import _POD_SUFFIX
+
+TOP_OBJECTS = 20
+
+def _seconds(delta):
+    return cast(func.extract("epoch", delta), Float)
+
+def _occurrences(start, end):
+    """
+    Occurrences of an event row within [start, end].
+
+    A row stands for `count` occurrences between first_timestamp and last_timestamp; they are
+    assumed evenly spread, so a window gets the share of that span it overlaps.
+    """
+    e = K8sEvent
+    first = func.coalesce(e.first_timestamp, e.last_timestamp)
+    span = _seconds(e.last_timestamp - first)
+    overlap = _seconds(func.least(e.last_timestamp, end) - func.greatest(first, start))
+    return case(
+        (span <= 0, case((and_(e.last_timestamp >= start, e.last_timestamp <= end), e.count), else_=0)),
+        else_=e.count * func.greatest(overlap, 0) / span,
+    )
+
+@register
+class EventStormDetector(Detector):
+    """
+    Bursts of Warning events per involved object (FailedScheduling, BackOff, OOMKilling,
+    FailedMount, ...), aggregated in SQL over sliding windows ending now. Pods are rolled up to
+    their workload, so a rollout whose pods each warn a little still shows up as one storm.
+
+    An object storms when, in any window, it has at least max(min_events, min_rate_per_minute *
+    window) occurrences and its rate is storm_factor times its rate over the baseline_hours
+    before the largest window. Findings are grouped per (cluster, namespace).
+    """
+    name = "event_storm"
+    default_config = {
+        "windows_minutes": [5, 15, 60],
+        "min_events": 20,
+        "min_rate_per_minute": 2.0,
+        "baseline_hours": 24,
+        "storm_factor": 5.0,
+        # Empty = every Warning reason
+        "reasons": [],
+    }
+    # ingested_at is restamped whenever an event repeats
+    inputs = {"k8s_events": ("ingested_at", "namespace")}
+    # The windows slide with the clock
+    full_refresh_seconds = 300
+
+    def _query(self, now, windows: list):
+        e = K8sEvent
+        largest = timedelta(minutes=windows[-1])
+        # Same suffix rule as workload_name(), evaluated in the database
+        obj = case(
+            (e.involved_kind == "Pod", func.regexp_replace(e.involved_name, _POD_SUFFIX.pattern, "")),
+            else_=e.involved_name,
+        ).label("involved_name")
+        baseline_start = now - largest - timedelta(hours=self.config["baseline_hours"])
+        # Served by ix_k8s_events_type_last, or ix_k8s_events_ns_type_last for scoped runs
+        q = select(
+            e.cluster, e.namespace, e.involved_kind, obj,
+            func.coalesce(e.reason, "Unknown").label("reason"),
+            func.count(e.involved_name.distinct()).label("objects"),
+            *[func.sum(_occurrences(now - timedelta(minutes=w), now)).label(f"w{w}") for w in windows],
+            func.sum(_occurrences(baseline_start, now - largest)).label("baseline"),
+        ).where(e.type == "Warning", e.last_timestamp >= baseline_start)
+        if self.config["reasons"]:
+            q = q.where(e.reason.in_(self.config["reasons"]))
+        if self.scopes is not None:
+            q = q.where(e.namespace.in_(self.scopes))
+        r = q.group_by(e.cluster, e.namespace, e.involved_kind, obj, e.reason).subquery("by_reason")
+        top = r.c[f"w{windows[-1]}"]
+        # One row per involved object with a busy largest window; reasons stay as a breakdown
+        return (
+            select(
+                r.c.cluster, r.c.namespace, r.c.involved_kind, r.c.involved_name,
+                *[func.sum(r.c[f"w{w}"]).label(f"w{w}") for w in windows],
+                func.sum(r.c.baseline).label("baseline"),
+                func.max(r.c.objects).label("objects"),
+                func.json_object_agg(r.c.reason, top).filter(top > 0).label("reasons"),
+            )
+            .group_by(r.c.cluster, r.c.namespace, r.c.involved_kind, r.c.involved_name)
+            .having(func.sum(top) >= self.config["min_events"])
+        )
+
+    def _storm(self, row, windows: list):
+        """Evidence for the window with the highest qualifying rate, or None if no window storms."""
+        cfg = self.config
+        baseline_rate = (row.baseline or 0.0) / (cfg["baseline_hours"] * 60)
+        best = None
+        for w in windows:
+            events = row._mapping[f"w{w}"] or 0.0
+            rate = events / w
+            if events < max(cfg["min_events"], cfg["min_rate_per_minute"] * w):
+                continue
+            if rate < cfg["storm_factor"] * baseline_rate:
+                continue
+            if best is None or rate > best["rate_per_minute"]:
+                best = {"window_minutes": w, "events": round(events), "rate_per_minute": round(rate, 2)}
+        if best is None:
+            return None
+        return {
+            "kind": row.involved_kind,
+            "name": row.involved_name,
+            "objects": row.objects,
+            **best,
+            "baseline_rate_per_minute": round(baseline_rate, 3),
+            "events_by_window": {str(w): round(row._mapping[f"w{w}"] or 0.0) for w in windows},
+            "reasons": {reason: round(n) for reason, n in (row.reasons or {}).items()},
+        }
+
+    def run(self):
+        now = datetime.now(timezone.utc)
+        windows = sorted(int(w) for w in self.config["windows_minutes"])
+        largest = windows[-1]
+        storms = {}
+        for row in self.db.execute(self._query(now, windows)):
+            storm = self._storm(row, windows)
+            if storm:
+                storms.setdefault((row.cluster, row.namespace), []).append(storm)
+
+        findings = []
+        for (cluster, ns), objects in storms.items():
+            objects.sort(key=lambda o: o["events_by_window"][str(largest)], reverse=True)
+            total = sum(o["events_by_window"][str(largest)] for o in objects)
+            reasons = Counter()
+            for o in objects:
+                reasons.update(o["reasons"])
+            where = f"{cluster}/{ns}" if cluster else ns
+            top_reasons = ", ".join(r for r, _ in reasons.most_common(3))
+            findings.append({
+                "id": str(uuid.uuid4()),
+                "type": self.name,
+                "fingerprint": f"{cluster}:{ns}:event_storm" if cluster else f"{ns}:event_storm",
+                "severity": 1 if total >= 50 * self.config["min_events"] else 2,
+                "confidence": 80,
+                "service_id": None,
+                "title": f"Warning event storm in {where}: {total} events from {sum(o['objects'] for o in objects)} objects in {largest}m ({top_reasons})",
+                "summary": "A burst of Warning events usually follows a bad rollout, a scheduling or storage problem, or memory pressure.",
+                "evidence": {
+                    "rule": (
+                        f"Warning events in a {'/'.join(map(str, windows))}m window >= max({self.config['min_events']}, "
+                        f"{self.config['min_rate_per_minute']}/min) and >= {self.config['storm_factor']}x the "
+                        f"{self.config['baseline_hours']}h baseline rate"
+                    ),
+                    "count": len(objects),
+                    "events": total,
+                    "reasons": dict(reasons.most_common()),
+                    "top_objects": objects[:TOP_OBJECTS],
+                },
+                "remediation": {
+                    "steps": [
+                        "Check recent rollouts in the namespace and pause or roll back the offending one.",
+                        "FailedScheduling: check node capacity, taints and resource requests.",
+                        "OOMKilling / BackOff: check memory limits and container logs.",
+                        "FailedMount: check PVC binding, storage class and secrets/configmaps.",
+                    ]
+                },
+            })
+        return findings
@@ -0,0 +1,146 @@
+import re
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from worker.detectors.base import Detector, register
+from worker.core.config import settings
+from worker.queries.k8s import pod_history
+
+# Deployment pods are <deployment>-<pod-template-hash>-<5 chars>, CronJob pods <cronjob>-<scheduled minute>-<5 chars>,
+# DaemonSet/Job pods <name>-<5 chars> and StatefulSet pods <name>-<ordinal>. Generated parts use Kubernetes'
+# vowel-free alphabet, so words such as "-exporter" are not mistaken for a hash. Also evaluated by Postgres
+# regexp_replace (event_storm), so keep the syntax portable.
+_K8S_ALPHANUM = "[bcdfghjklmnpqrstvwxz2456789]"
+_POD_SUFFIX = re.compile(rf"(-{_K8S_ALPHANUM}{{8,10}}|-[0-9]{{8}})?-{_K8S_ALPHANUM}{{5}}$|-[0-9]+$")
+
+def workload_name(pod: str) -> str:
+    return _POD_SUFFIX.sub("", pod) or pod
+
+def robust_z(x: np.ndarray) -> np.ndarray:
+    """Modified z-score (median / MAD); falls back to the mean absolute deviation when MAD is 0."""
+    med = np.median(x)
+    dev = np.abs(x - med)
+    scale = 1.4826 * np.median(dev)
+    if scale == 0:
+        scale = 1.253314 * dev.mean()
+    if scale == 0:
+        return np.zeros_like(x, dtype=np.float64)
+    return (x - med) / scale
+
+def load_history(db, since, batch_size: int = 50000) -> dict:
+    """pod_history(since) as NumPy columns, streamed in batches without building ORM objects."""
+    names = ("cluster", "namespace", "pod", "restart_count", "created_at")
+    dtypes = (object, object, object, np.int64, np.float64)
+    parts = [[] for _ in names]
+    result = db.execute(pod_history(since).execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        for part, dtype, values in zip(parts, dtypes, zip(*batch)):
+            part.append(np.array(values, dtype=dtype))
+    return {n: np.concatenate(p) if p else np.empty(0, dtype=d) for n, d, p in zip(names, dtypes, parts)}
+
+def restart_rates(history: dict, now: float, recent_seconds: float, window_seconds: float) -> dict:
+    """
+    Per-pod restart rates from load_history() columns (rows sorted by pod, then time).
+
+    Restart deltas are taken between consecutive snapshots of the same pod (counter resets count
+    as 0) and summed per pod into the recent window and the baseline before it, in restarts/hour.
+    A pod's first row only anchors the deltas; pod_history() makes it the last snapshot from before
+    the window, so the first in-window change counts.
+    """
+    n = len(history["pod"])
+    cluster, ns, pod = history["cluster"], history["namespace"], history["pod"]
+    rc, t = history["restart_count"], history["created_at"]
+    new_pod = np.ones(n, dtype=bool)
+    if n > 1:
+        new_pod[1:] = (pod[1:] != pod[:-1]) | (ns[1:] != ns[:-1]) | (cluster[1:] != cluster[:-1])
+    seg = np.cumsum(new_pod) - 1
+    delta = np.zeros(n, dtype=np.int64)
+    if n > 1:
+        delta[1:] = np.maximum(np.diff(rc), 0)
+    delta[new_pod] = 0
+
+    recent = t >= now - recent_seconds
+    pods = int(seg[-1]) + 1 if n else 0
+    recent_restarts = np.bincount(seg, weights=delta * recent, minlength=pods)
+    baseline_restarts = np.bincount(seg, weights=delta * ~recent, minlength=pods)
+    first = np.flatnonzero(new_pod)
+    return {
+        "cluster": cluster[first],
+        "namespace": ns[first],
+        "pod": pod[first],
+        "recent_restarts": recent_restarts,
+        "rate": recent_restarts / (recent_seconds / 3600),
+        "baseline_rate": baseline_restarts / (max(window_seconds - recent_seconds, recent_seconds) / 3600),
+    }
+
+@register
+class RestartRateDetector(Detector):
+    name = "restart_rate_anomaly"
+    default_config = {"recent_minutes": 60, "z_threshold": 3.5, "min_restarts": 3}
+    inputs = {"k8s_pod_snapshots": ("created_at", "namespace")}
+    # "Now" moves: the recent window has to be re-evaluated even without new snapshots
+    full_refresh_seconds = 600
+
+    def run(self):
+        window_seconds = settings.POD_SNAPSHOT_LOOKBACK_HOURS * 3600
+        history = load_history(self.db, datetime.now(timezone.utc) - timedelta(seconds=window_seconds))
+        if not len(history["pod"]):
+            return []
+        recent_seconds = float(self.config["recent_minutes"]) * 60
+        rates = restart_rates(history, time.time(), recent_seconds, window_seconds)
+
+        # Scored against the whole fleet, even when only some namespaces are being re-evaluated
+        z = robust_z(rates["rate"])
+        anomalous = (
+            (z >= self.config["z_threshold"])
+            & (rates["recent_restarts"] >= self.config["min_restarts"])
+            & (rates["rate"] > rates["baseline_rate"])
+        )
+        if self.scopes is not None:
+            anomalous &= np.isin(rates["namespace"], list(self.scopes))
+        idx = np.flatnonzero(anomalous)
+        if not len(idx):
+            return []
+
+        by_workload = {}
+        for i in idx[np.argsort(-z[idx])]:
+            key = (rates["cluster"][i], rates["namespace"][i], workload_name(rates["pod"][i]))
+            by_workload.setdefault(key, []).append({
+                "pod": rates["pod"][i],
+                "recent_restarts": int(rates["recent_restarts"][i]),
+                "rate_per_hour": round(float(rates["rate"][i]), 2),
+                "baseline_per_hour": round(float(rates["baseline_rate"][i]), 2),
+                "z": round(float(z[i]), 1),
+            })
+
+        findings = []
+        for (cluster, ns, workload), pods in by_workload.items():
+            where = f"{cluster}/{ns}" if cluster else ns
+            fingerprint = f"{cluster}:{ns}:{workload}:restart_rate" if cluster else f"{ns}:{workload}:restart_rate"
+            findings.append({
+                "id": str(uuid.uuid4()),
+                "type": self.name,
+                "fingerprint": fingerprint,
+                "severity": 1 if pods[0]["z"] >= 2 * self.config["z_threshold"] else 2,
+                "confidence": 75,
+                "service_id": None,
+                "title": f"Restart spike in {where}/{workload}: {len(pods)} pods restarting faster than usual",
+                "summary": "Restart rate over the last hour is an outlier across the fleet and above the pod's own baseline.",
+                "evidence": {
+                    "rule": (
+                        f"robust z(restarts/hour, last {self.config['recent_minutes']}m) >= {self.config['z_threshold']} "
+                        f"AND restarts >= {self.config['min_restarts']} AND rate > baseline"
+                    ),
+                    "count": len(pods),
+                    "top_pods": pods[:20],
+                },
+                "remediation": {
+                    "steps": [
+                        "Check what changed for this workload in the last hour (deploys, config, dependencies).",
+                        "Inspect logs and exit codes of the restarting containers.",
+                        "Look for OOMKilled and probe failures in pod events.",
+                    ]
+                },
+            })
+        return findings
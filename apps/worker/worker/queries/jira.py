@@ -0,0 +1,51 @@
+"""
+Status intervals derived from the Jira changelog.
+
+jira_status_intervals holds one row per status an issue has been in: seq 0 is the status it
+was created in (the from side of its first transition, or its current status if it never
+moved), then one row per status transition. left_at is the next interval's entered_at, NULL
+for the current status. Intervals are rebuilt per issue whenever an issue changes, so
+detectors read durations directly instead of replaying the changelog.
+"""
+from sqlalchemy import select, delete, func, literal, union_all, and_
+from worker.db_models import JiraIssue, JiraChangelogEvent, JiraStatusInterval
+
+INTERVAL_COLUMNS = ["issue_key", "seq", "project_key", "status", "entered_at", "left_at"]
+
+def status_intervals(keys):
+    """Selectable computing the intervals of the issues in `keys` (a list or a select of keys)."""
+    i, e = JiraIssue, JiraChangelogEvent
+    # Served by the partial index ix_jira_changelog_status_issue
+    ev = (
+        select(
+            e.issue_key, e.created_at, e.from_string, e.to_string,
+            func.row_number().over(partition_by=e.issue_key, order_by=(e.created_at, e.id)).label("seq"),
+        )
+        .where(e.field == "status", e.issue_key.in_(keys))
+        .cte("ev")
+    )
+    initial = (
+        select(
+            i.key.label("issue_key"), literal(0).label("seq"), i.project_key,
+            func.coalesce(ev.c.from_string, i.status).label("status"), i.created_at_jira.label("entered_at"),
+        )
+        .select_from(i.__table__.outerjoin(ev, and_(ev.c.issue_key == i.key, ev.c.seq == 1)))
+        .where(i.key.in_(keys))
+    )
+    transitions = (
+        select(ev.c.issue_key, ev.c.seq, i.project_key, ev.c.to_string.label("status"), ev.c.created_at.label("entered_at"))
+        .select_from(ev.join(i.__table__, i.key == ev.c.issue_key))
+    )
+    u = union_all(initial, transitions).subquery("u")
+    left_at = func.lead(u.c.entered_at).over(partition_by=u.c.issue_key, order_by=u.c.seq)
+    return select(u.c.issue_key, u.c.seq, u.c.project_key, u.c.status, u.c.entered_at, left_at.label("left_at"))
+
+def refresh_status_intervals(db, keys) -> int:
+    """Recompute the intervals of `keys` (a list or a select of keys) in place; returns rows written."""
+    if isinstance(keys, (list, tuple, set)):
+        keys = list(keys)
+        if not keys:
+            return 0
+    db.execute(delete(JiraStatusInterval).where(JiraStatusInterval.issue_key.in_(keys)))
+    stmt = JiraStatusInterval.__table__.insert().from_select(INTERVAL_COLUMNS, status_intervals(keys))
+    return db.execute(stmt).rowcount
@@ -0,0 +1,100 @@
+"""
+Read-side queries over pod state.
+
+k8s_pod_states holds the current state of each pod. In delta mode k8s_pod_snapshots is a
+change log (one row per state change), so the state of a pod at time T is its latest
+snapshot at or before T; ix_k8s_pod_snapshots_pod_time serves that DISTINCT ON lookup. Deletions
+are logged as tombstone snapshots (deleted = true), so a pod deleted before T is not live at T
+even if it was later recreated under the same name.
+"""
+from sqlalchemy import select, func, cast, and_, true, union_all, Float
+from sqlalchemy.orm import aliased
+from worker.core.config import settings
+from worker.db_models import K8sPodSnapshot, K8sPodState
+
+def current_pod_states(db, cluster: str = None, namespace: str = None):
+    """Live pods (not seen deleted) with their latest state."""
+    q = select(K8sPodState).where(K8sPodState.deleted_at.is_(None))
+    if cluster is not None:
+        q = q.where(K8sPodState.cluster == cluster)
+    if namespace is not None:
+        q = q.where(K8sPodState.namespace == namespace)
+    return db.execute(q).scalars().all()
+
+def pod_states_as_of(db, at, cluster: str = None, namespace: str = None):
+    """Latest snapshot per pod recorded at or before `at`, skipping pods whose latest one is a deletion tombstone."""
+    s = K8sPodSnapshot
+    q = (
+        select(s)
+        .where(s.created_at <= at)
+        .distinct(s.cluster, s.namespace, s.pod)
+        .order_by(s.cluster, s.namespace, s.pod, s.created_at.desc())
+    )
+    if cluster is not None:
+        q = q.where(s.cluster == cluster)
+    if namespace is not None:
+        q = q.where(s.namespace == namespace)
+    latest = aliased(K8sPodSnapshot, q.subquery("latest"))
+    return db.execute(select(latest).where(latest.deleted.is_(False))).scalars().all()
+
+def latest_pods(since=None):
+    """
+    Selectable with one row per live pod (cluster, namespace, pod, node, phase, restart_count, reason).
+
+    Delta mode reads k8s_pod_states directly; append mode takes the latest snapshot of each pod
+    seen since `since`.
+    """
+    if settings.K8S_SNAPSHOT_MODE == "delta":
+        st = K8sPodState
+        return (
+            select(st.cluster, st.namespace, st.pod, st.node, st.phase, st.restart_count, st.reason)
+            .where(st.deleted_at.is_(None))
+            .subquery("latest_pods")
+        )
+    s = K8sPodSnapshot
+    q = (
+        select(s.cluster, s.namespace, s.pod, s.node, s.phase, s.restart_count, s.reason)
+        .distinct(s.cluster, s.namespace, s.pod)
+        .order_by(s.cluster, s.namespace, s.pod, s.created_at.desc())
+    )
+    if since is not None:
+        q = q.where(s.created_at >= since)
+    return q.subquery("latest_pods")
+
+def pod_history(since):
+    """
+    Snapshot time series per pod since `since`, oldest first (in delta mode: one row per state change),
+    with created_at as float epoch seconds.
+
+    Each pod seen since `since` also gets its latest earlier snapshot as a leading baseline row. In
+    delta mode a pod that was quiet until now has a single row in the window, and the first change
+    has to be measured against the state before it.
+    """
+    s = K8sPodSnapshot
+    in_window = select(s.cluster, s.namespace, s.pod, s.restart_count, s.created_at).where(s.created_at >= since)
+    pods = select(s.cluster, s.namespace, s.pod).where(s.created_at >= since).distinct().subquery("window_pods")
+    prev = aliased(K8sPodSnapshot)
+
+    def latest_before(same_cluster):
+        # One backward scan of ix_k8s_pod_snapshots_pod_time per pod, not a read of its whole history
+        # (IS NOT DISTINCT FROM on cluster would not be usable as an index condition, hence two branches)
+        last = (
+            select(prev.restart_count, prev.created_at)
+            .where(same_cluster, prev.namespace == pods.c.namespace, prev.pod == pods.c.pod, prev.created_at < since)
+            .order_by(prev.created_at.desc())
+            .limit(1)
+            .lateral("baseline")
+        )
+        return select(pods.c.cluster, pods.c.namespace, pods.c.pod, last.c.restart_count, last.c.created_at).select_from(
+            pods.join(last, true())
+        )
+
+    h = union_all(
+        latest_before(prev.cluster == pods.c.cluster),
+        latest_before(and_(prev.cluster.is_(None), pods.c.cluster.is_(None))),
+        in_window,
+    ).subquery("history")
+    return (
+        select(h.c.cluster, h.c.namespace, h.c.pod, h.c.restart_count, cast(func.extract("epoch", h.c.created_at), Float).label("created_at"))
+        .order_by(h.c.cluster, h.c.namespace, h.c.pod, h.c.created_at)
+    )
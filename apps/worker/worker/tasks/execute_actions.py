@@ -29,8 +29,8 @@ async def _execute_action(action: RemediationAction) -> dict:
         )
     elif action.action_type in ["restart_pods", "scale_deployment"]:
         # Initialize K8s client
-        from worker.connectors.k8s import get_k8s_client
-        k8s_client = get_k8s_client()
+        from worker.connectors.k8s import get_k8s_client, cluster_context
+        k8s_client = get_k8s_client(cluster_context(action.params.get("cluster")))
         if not k8s_client:
             raise ValueError("Kubernetes client not available")
         executor = executor_class(k8s_client)
@@ -0,0 +1,198 @@
+"""
+Bulk import of Jira CSV exports into jira_issues.
+
+Rows are streamed from the file, COPY'd into a temporary staging table in batches and
+merged into jira_issues with a single INSERT ... SELECT ... ON CONFLICT per batch, so
+memory stays flat regardless of export size.
+"""
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from dateutil import parser as dtparser
+from sqlalchemy import table, column, select, func, or_, text
+from sqlalchemy.dialects.postgresql import insert
+from worker.celery_app import celery_app
+from worker.core.db import SessionLocal
+from worker.core.config import settings
+from worker.core.hashing import content_hash
+from worker.db_models import JiraIssue
+
+logger = logging.getLogger(__name__)
+
+STAGE_TABLE = "jira_issues_csv_stage"
+COLUMNS = [
+    "key", "issue_id", "project_key", "issue_type", "status", "status_category", "priority",
+    "summary", "assignee", "reporter", "created_at_jira", "updated_at_jira", "raw", "content_hash",
+]
+
+# Jira export header -> jira_issues column; the first header found wins
+HEADER_MAP = {
+    "key": ["Issue key", "Key"],
+    "issue_id": ["Issue id", "Issue ID"],
+    "project_key": ["Project key", "Project"],
+    "issue_type": ["Issue Type"],
+    "status": ["Status"],
+    "status_category": ["Status Category"],
+    "priority": ["Priority"],
+    "summary": ["Summary"],
+    "assignee": ["Assignee"],
+    "reporter": ["Reporter"],
+    "created_at_jira": ["Created"],
+    "updated_at_jira": ["Updated"],
+}
+
+STATUS_CATEGORIES = {
+    "to do": "To Do", "open": "To Do", "backlog": "To Do", "new": "To Do", "selected for development": "To Do",
+    "in progress": "In Progress", "in review": "In Progress",
+    "done": "Done", "closed": "Done", "resolved": "Done",
+}
+
+def _column_index(header: list) -> dict:
+    # Exports repeat some headers (Sprint, Labels, ...), so map by position instead of csv.DictReader
+    positions = {}
+    for i, name in enumerate(header):
+        positions.setdefault(name.strip(), i)
+    out = {}
+    for col, names in HEADER_MAP.items():
+        for name in names:
+            if name in positions:
+                out[col] = positions[name]
+                break
+    return out
+
+# Jira's default export format ("05/Jan/23 10:15 AM"), tried before falling back to dateutil
+CSV_DT_FORMATS = ("%d/%b/%y %I:%M %p", "%d/%b/%Y %I:%M %p")
+
+@lru_cache(maxsize=65536)
+def _csv_dt(s: str):
+    # Exports repeat the same minute-resolution timestamps a lot, hence the cache
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        dt = None
+    for fmt in CSV_DT_FORMATS if dt is None else ():
+        try:
+            dt = datetime.strptime(s, fmt)
+            break
+        except ValueError:
+            continue
+    if dt is None:
+        try:
+            dt = dtparser.parse(s)
+        except (ValueError, OverflowError):
+            return None
+    if dt.tzinfo is None:
+        # Exports are rendered in the exporting user's profile timezone, the same one JQL uses
+        dt = dt.replace(tzinfo=ZoneInfo(settings.JIRA_JQL_TIMEZONE))
+    return dt.isoformat()
+
+def _stage_row(header: list, index: dict, values: list, default_status: str = None):
+    get = lambda col: (values[index[col]].strip() or None) if col in index and index[col] < len(values) else None
+    project_key = get("project_key")
+    if not project_key:
+        return None
+    raw = {h: v for h, v in zip(header, values) if v}
+    digest = content_hash(raw)
+    created_at = _csv_dt(get("created_at_jira"))
+    key = get("key")
+    if not key:
+        # Synthetic keys hash only what an issue never changes, so a re-export updates the same row
+        identity = {"project": project_key, "created": created_at, "summary": get("summary")}
+        key = f"{project_key}:csv:{content_hash(identity)[:12]}"
+    status = get("status") or default_status
+    status_category = get("status_category") or STATUS_CATEGORIES.get((status or "").lower())
+    return [
+        key,
+        get("issue_id"),
+        project_key,
+        get("issue_type"),
+        status,
+        status_category,
+        get("priority"),
+        get("summary"),
+        get("assignee"),
+        get("reporter"),
+        created_at,
+        _csv_dt(get("updated_at_jira")),
+        json.dumps(raw),
+        digest,
+    ]
+
+def _merge_stmt():
+    stage = table(STAGE_TABLE, *[column(c) for c in COLUMNS])
+    issues = JiraIssue.__table__
+    # DISTINCT ON keeps one row per key (the newest dated one), since ON CONFLICT cannot touch the same row twice
+    src = select(*[stage.c[c] for c in COLUMNS]).distinct(stage.c.key).order_by(stage.c.key, stage.c.updated_at_jira.desc().nulls_last())
+    stmt = insert(issues).from_select(COLUMNS, src)
+    update_cols = {c: stmt.excluded[c] for c in COLUMNS if c != "key"}
+    update_cols["ingested_at"] = func.now()
+    # Never overwrite a row with an older version of the issue (e.g. one already refreshed from the API)
+    return stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_=update_cols,
+        where=or_(issues.c.updated_at_jira.is_(None), stmt.excluded.updated_at_jira > issues.c.updated_at_jira),
+    )
+
+def _copy_batch(db, rows: list) -> int:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    # Staging table lives for this batch's transaction only
+    db.execute(text(
+        f"CREATE TEMP TABLE {STAGE_TABLE} ON COMMIT DROP "
+        f"AS SELECT {', '.join(COLUMNS)} FROM jira_issues WITH NO DATA"
+    ))
+    cur = db.connection().connection.cursor()
+    try:
+        cur.copy_expert(f"COPY {STAGE_TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cur.close()
+    merged = db.execute(_merge_stmt()).rowcount
+    db.commit()
+    return merged
+
+@celery_app.task
+def import_jira_csv(path: str, batch_size: int = 10000, default_status: str = None):
+    """Stream a Jira CSV export into jira_issues. default_status fills in exports without a Status column."""
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    started = time.perf_counter()
+    read = merged = skipped = 0
+    with SessionLocal() as db, open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return {"rows_read": 0, "rows_merged": 0, "rows_skipped": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        index = _column_index(header)
+        if "project_key" not in index:
+            raise ValueError("CSV export has no 'Project key' or 'Project' column")
+        batch = []
+        for values in reader:
+            read += 1
+            row = _stage_row(header, index, values, default_status)
+            if row is None:
+                skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                merged += _copy_batch(db, batch)
+                batch = []
+                elapsed = time.perf_counter() - started
+                logger.info("Imported %d rows from %s (%.0f rows/s)", read, path, read / elapsed if elapsed else 0)
+        if batch:
+            merged += _copy_batch(db, batch)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows_read": read,
+        "rows_merged": merged,
+        "rows_skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(read / elapsed, 1) if elapsed else 0.0,
+    }
@@ -1,24 +1,47 @@
+from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, select, delete, exists
 from sqlalchemy.dialects.postgresql import insert
 from worker.celery_app import celery_app
 from worker.core.db import SessionLocal
 from worker.core.config import settings
-from worker.connectors.jira import search_issues, parse_dt
-from worker.db_models import JiraIssue, JiraChangelogEvent
+from worker.core.pipeline import prefetch
+from worker.core.hashing import content_hash
+from worker.core.payloads import pack
+from worker.connectors.jira import iter_issue_pages, parse_dt, get_stats, reset_stats
+from worker.db_models import JiraIssue, JiraChangelogEvent, JiraSyncState, JiraRawPayload
+from worker.queries.jira import refresh_status_intervals
 
-def _project_jql():
+def _project_keys():
     projects = [p.strip() for p in settings.JIRA_PROJECT_KEYS.split(",") if p.strip()]
     if not projects:
         raise RuntimeError("JIRA_PROJECT_KEYS is empty")
-    base = f"project in ({','.join(projects)})"
+    return projects
+
+def _jql_datetime(dt: datetime) -> str:
+    # JQL dates have minute precision and are read in the Jira user's profile timezone
+    return dt.astimezone(ZoneInfo(settings.JIRA_JQL_TIMEZONE)).strftime("%Y/%m/%d %H:%M")
+
+def _project_jql(project_key: str, since: datetime = None):
+    base = f'project = "{project_key}"'
     extra = (settings.JIRA_JQL_EXTRA or "").strip()
     if extra:
         base = f"({base}) AND ({extra})"
-    base = f"{base} AND updated >= -30d ORDER BY updated DESC"
-    return base
+    if since:
+        base = f'{base} AND updated >= "{_jql_datetime(since)}"'
+    # Oldest first, so a run that stops early resumes from its watermark next time
+    return f"{base} ORDER BY updated ASC"
+
+def _stored_issue_doc(issue_payload: dict) -> dict:
+    # Histories are stored once each via the changelog rows, so keep only the changelog paging metadata
+    doc = dict(issue_payload)
+    if "changelog" in doc:
+        doc["changelog"] = {k: v for k, v in (doc["changelog"] or {}).items() if k != "histories"}
+    return doc
 
-def _upsert_issue(db, issue_payload: dict):
+def _issue_row(issue_payload: dict) -> dict:
     fields = issue_payload.get("fields", {}) or {}
-    issue = {
+    return {
         "key": issue_payload["key"],
         "issue_id": issue_payload.get("id"),
         "project_key": (fields.get("project") or {}).get("key"),
@@ -31,22 +54,23 @@ def _upsert_issue(db, issue_payload: dict):
         "reporter": (fields.get("reporter") or {}).get("displayName") if fields.get("reporter") else None,
         "created_at_jira": parse_dt(fields.get("created")),
         "updated_at_jira": parse_dt(fields.get("updated")),
-        "raw": issue_payload,
+        "raw": {},
+        "raw_hash": content_hash(_stored_issue_doc(issue_payload)),
+        "content_hash": content_hash(issue_payload),
     }
-    stmt = insert(JiraIssue).values(**issue)
-    update_cols = {k: stmt.excluded[k] for k in issue.keys() if k != "key"}
-    db.execute(stmt.on_conflict_do_update(index_elements=[JiraIssue.key], set_=update_cols))
 
-def _upsert_changelog(db, issue_key: str, changelog: dict):
+def _changelog_rows(issue_key: str, changelog: dict) -> list:
+    rows = []
     histories = (changelog or {}).get("histories", []) or []
     for h in histories:
         history_id = str(h.get("id"))
         author = ((h.get("author") or {}).get("displayName")) if h.get("author") else None
         created_at = parse_dt(h.get("created"))
+        history_hash = content_hash(h)
         items = h.get("items", []) or []
         for idx, it in enumerate(items):
             event_id = f"{issue_key}:{history_id}:{idx}"
-            row = {
+            rows.append({
                 "id": event_id,
                 "issue_key": issue_key,
                 "history_id": history_id,
@@ -55,32 +79,178 @@ def _upsert_changelog(db, issue_key: str, changelog: dict):
                 "field": it.get("field"),
                 "from_string": it.get("fromString"),
                 "to_string": it.get("toString"),
-                "raw": {"history": h, "item": it},
-            }
-            stmt = insert(JiraChangelogEvent).values(**row)
-            update_cols = {k: stmt.excluded[k] for k in row.keys() if k != "id"}
-            db.execute(stmt.on_conflict_do_update(index_elements=[JiraChangelogEvent.id], set_=update_cols))
+                "raw": {"item": it},
+                "raw_hash": history_hash,
+                "content_hash": history_hash,
+            })
+    return rows
+
+def _upsert_row(db, model, pk: str, row: dict):
+    stmt = insert(model).values(**row)
+    update_cols = {k: stmt.excluded[k] for k in row.keys() if k != pk}
+    update_cols["ingested_at"] = func.now()
+    db.execute(stmt.on_conflict_do_update(index_elements=[pk], set_=update_cols))
+
+def _bulk_upsert(db, model, pk: str, rows: list):
+    # ON CONFLICT cannot touch the same row twice in one statement, so keep the last copy of each key.
+    rows = list({r[pk]: r for r in rows}.values())
+    if not rows:
+        return
+    # Core insert on the table (not the ORM entity) so executemany is batched into multi-VALUES
+    # statements with every column bound, rather than regrouped by which values are None.
+    stmt = insert(model.__table__)
+    update_cols = {k: stmt.excluded[k] for k in rows[0].keys() if k != pk}
+    # Rewritten rows are restamped so detector checkpoints (which watch ingested_at) see the change
+    update_cols["ingested_at"] = func.now()
+    db.execute(stmt.on_conflict_do_update(index_elements=[pk], set_=update_cols), rows)
+
+def _history_count(issue: dict) -> int:
+    histories = ((issue.get("changelog") or {}).get("histories", [])) or []
+    return sum(len(h.get("items", []) or []) for h in histories)
+
+def _changed_rows(db, issues: list):
+    """Rows whose content hash differs from what is stored; unchanged issues and histories are skipped.
+
+    Returns (issue rows, changelog rows, raw payload rows) to write.
+    """
+    issue_rows = [_issue_row(i) for i in issues]
+    keys = [r["key"] for r in issue_rows]
+    # Rows still embedding their raw JSON (no raw_hash) count as changed so they move to the payload store
+    q = select(JiraIssue.key, JiraIssue.content_hash).where(JiraIssue.key.in_(keys), JiraIssue.raw_hash.isnot(None))
+    stored = dict(db.execute(q).all())
+    changed = [(i, r) for i, r in zip(issues, issue_rows) if stored.get(r["key"]) != r["content_hash"]]
+    payloads = [pack(_stored_issue_doc(i)) for i, _ in changed]
+    event_rows = []
+    histories = {}
+    for issue, row in changed:
+        event_rows.extend(_changelog_rows(row["key"], issue.get("changelog")))
+        for h in ((issue.get("changelog") or {}).get("histories", []) or []):
+            histories[(row["key"], str(h.get("id")))] = h
+    if event_rows:
+        # The issue hash covers its changelog, so only histories of changed issues need comparing
+        q = select(JiraChangelogEvent.issue_key, JiraChangelogEvent.history_id, JiraChangelogEvent.content_hash).where(
+            JiraChangelogEvent.issue_key.in_([r["key"] for _, r in changed]),
+            JiraChangelogEvent.raw_hash.isnot(None),
+        ).distinct()
+        stored_histories = set(db.execute(q).all())
+        event_rows = [r for r in event_rows if (r["issue_key"], r["history_id"], r["content_hash"]) not in stored_histories]
+        payloads.extend(pack(histories[k]) for k in {(r["issue_key"], r["history_id"]) for r in event_rows})
+    return [r for _, r in changed], event_rows, payloads
+
+def _store_payloads(db, payloads: list):
+    payloads = list({p["hash"]: p for p in payloads}.values())
+    if payloads:
+        stmt = insert(JiraRawPayload.__table__)
+        # DO UPDATE (not DO NOTHING) row-locks payloads that already exist, so a concurrent
+        # prune_jira_payloads can't delete one before this transaction's rows reference it
+        stmt = stmt.on_conflict_do_update(index_elements=["hash"], set_={"hash": stmt.excluded.hash})
+        db.execute(stmt, payloads)
+
+def _write_page(db, issues: list) -> dict:
+    issue_rows, event_rows, payloads = _changed_rows(db, issues)
+    _store_payloads(db, payloads)
+    if settings.JIRA_WRITE_MODE == "row":
+        for row in issue_rows:
+            _upsert_row(db, JiraIssue, "key", row)
+        for row in event_rows:
+            _upsert_row(db, JiraChangelogEvent, "id", row)
+    else:
+        _bulk_upsert(db, JiraIssue, "key", issue_rows)
+        _bulk_upsert(db, JiraChangelogEvent, "id", event_rows)
+    # The issue hash covers its changelog, so only changed issues can have new status intervals
+    intervals = refresh_status_intervals(db, [r["key"] for r in issue_rows])
+    events_seen = sum(_history_count(i) for i in issues)
+    return {
+        "issues_written": len(issue_rows),
+        "issues_skipped": len(issues) - len(issue_rows),
+        "events_written": len(event_rows),
+        "events_skipped": events_seen - len(event_rows),
+        "intervals_written": intervals,
+    }
+
+def _advance_watermark(db, project_key: str, updated_at, full: bool):
+    now = datetime.now(timezone.utc)
+    row = {"project_key": project_key, "max_updated_at_jira": updated_at, "last_synced_at": now}
+    if full:
+        row["last_full_sync_at"] = now
+    stmt = insert(JiraSyncState).values(**row)
+    update_cols = {k: stmt.excluded[k] for k in row.keys() if k != "project_key"}
+    # GREATEST ignores NULLs, so an empty page never moves the watermark backwards
+    update_cols["max_updated_at_jira"] = func.greatest(JiraSyncState.max_updated_at_jira, stmt.excluded.max_updated_at_jira)
+    db.execute(stmt.on_conflict_do_update(index_elements=[JiraSyncState.project_key], set_=update_cols))
+
+def _sync_project(db, project_key: str, full: bool, budget: int):
+    state = db.get(JiraSyncState, project_key)
+    since = None
+    if not full and state and state.max_updated_at_jira:
+        since = state.max_updated_at_jira - timedelta(minutes=settings.JIRA_SYNC_OVERLAP_MINUTES)
+    jql = _project_jql(project_key, since)
+    total = 0
+    writes = {"issues_written": 0, "issues_skipped": 0, "events_written": 0, "events_skipped": 0, "intervals_written": 0}
+    # Next page is fetched on a background thread while the current one is written
+    for issues in prefetch(iter_issue_pages(jql, max_results=settings.JIRA_PAGE_SIZE), settings.JIRA_PREFETCH_PAGES):
+        if budget:
+            issues = issues[:budget - total]
+        for k, v in _write_page(db, issues).items():
+            writes[k] += v
+        total += len(issues)
+        updated = [d for d in (parse_dt((i.get("fields") or {}).get("updated")) for i in issues) if d]
+        _advance_watermark(db, project_key, max(updated) if updated else None, full=False)
+        db.commit()
+        if budget and total >= budget:
+            break
+    _advance_watermark(db, project_key, None, full=full)
+    db.commit()
+    return {"issues": total, **writes, "since": since.isoformat() if since else None, "jql": jql}
 
 @celery_app.task
-def ingest_jira():
-    jql = _project_jql()
+def ingest_jira(full: bool = False):
+    """Sync changed issues per project since its stored watermark; full=True re-reads everything."""
     total = 0
-    start_at = 0
-    max_results = 50
+    projects = {}
+    reset_stats()
+    writes = {"issues_written": 0, "issues_skipped": 0, "events_written": 0, "events_skipped": 0, "intervals_written": 0}
     with SessionLocal() as db:
-        while total < settings.JIRA_MAX_ISSUES:
-            page = search_issues(jql=jql, start_at=start_at, max_results=max_results)
-            issues = page.get("issues", []) or []
-            if not issues:
-                break
-            for issue in issues:
-                _upsert_issue(db, issue)
-                _upsert_changelog(db, issue["key"], issue.get("changelog"))
-                total += 1
-                if total >= settings.JIRA_MAX_ISSUES:
+        for project_key in _project_keys():
+            budget = 0
+            if settings.JIRA_MAX_ISSUES and not full:
+                budget = settings.JIRA_MAX_ISSUES - total
+                if budget <= 0:
                     break
+            projects[project_key] = _sync_project(db, project_key, full, budget)
+            total += projects[project_key]["issues"]
+            for k in writes:
+                writes[k] += projects[project_key][k]
+    return {
+        "ingested_issues": total,
+        **writes,
+        "mode": "full" if full else "incremental",
+        "projects": projects,
+        "write_mode": settings.JIRA_WRITE_MODE,
+        "http": get_stats(),
+    }
+
+@celery_app.task
+def rebuild_status_intervals(project_key: str = None):
+    """Recompute jira_status_intervals from the stored changelog, one project per transaction (backfill)."""
+    projects = {}
+    with SessionLocal() as db:
+        q = select(JiraIssue.project_key).distinct()
+        if project_key:
+            q = q.where(JiraIssue.project_key == project_key)
+        for key in db.scalars(q).all():
+            projects[key] = refresh_status_intervals(db, select(JiraIssue.key).where(JiraIssue.project_key == key))
             db.commit()
-            start_at += len(issues)
-            if start_at >= int(page.get("total", 0) or 0):
-                break
-    return {"ingested_issues": total, "jql": jql}
+    return {"intervals_written": sum(projects.values()), "projects": projects}
+
+@celery_app.task
+def prune_jira_payloads():
+    """Delete raw payloads no longer referenced by any issue or changelog row."""
+    with SessionLocal() as db:
+        stmt = delete(JiraRawPayload).where(
+            ~exists().where(JiraIssue.raw_hash == JiraRawPayload.hash),
+            ~exists().where(JiraChangelogEvent.raw_hash == JiraRawPayload.hash),
+        )
+        deleted = db.execute(stmt).rowcount
+        db.commit()
+    return {"payloads_deleted": deleted}
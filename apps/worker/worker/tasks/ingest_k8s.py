@@ -1,87 +1,254 @@
+import logging
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from sqlalchemy import select, update, func, case, tuple_, or_
 from sqlalchemy.dialects.postgresql import insert
 from worker.celery_app import celery_app
 from worker.core.db import SessionLocal
 from worker.core.config import settings
-from worker.connectors.k8s import load_client, namespace_filter
-from worker.db_models import K8sPodSnapshot, K8sEvent
-
-def _restart_count(pod) -> int:
-    total = 0
-    statuses = (pod.status.container_statuses or []) + (pod.status.init_container_statuses or [])
-    for s in statuses:
-        total += int(getattr(s, "restart_count", 0) or 0)
-    return total
-
-def _reason(pod):
-    statuses = pod.status.container_statuses or []
-    for s in statuses:
-        st = getattr(s, "state", None)
-        if st and st.waiting and st.waiting.reason:
-            return st.waiting.reason
+from worker.connectors.k8s import load_client, namespace_filter, cluster_contexts, cluster_name, list_scopes, iter_list_chunks, parse_dt
+from worker.db_models import K8sPodSnapshot, K8sPodState, K8sEvent
+
+logger = logging.getLogger(__name__)
+
+# Row builders take objects in Kubernetes API JSON shape (camelCase dicts), as returned by
+# watch events' raw_object or by to_dict() on list results.
+
+def _restart_count(pod: dict) -> int:
+    status = pod.get("status") or {}
+    statuses = (status.get("containerStatuses") or []) + (status.get("initContainerStatuses") or [])
+    return sum(int(s.get("restartCount") or 0) for s in statuses)
+
+def _reason(pod: dict):
+    for s in (pod.get("status") or {}).get("containerStatuses") or []:
+        waiting = (s.get("state") or {}).get("waiting") or {}
+        if waiting.get("reason"):
+            return waiting["reason"]
     return None
 
-@celery_app.task
-def ingest_k8s():
-    v1 = load_client()
+def pod_row(pod: dict, cluster: str = None) -> dict:
+    meta = pod.get("metadata") or {}
+    return {
+        "id": str(uuid.uuid4()),
+        "cluster": cluster,
+        "namespace": meta.get("namespace"),
+        "pod": meta.get("name"),
+        "node": (pod.get("spec") or {}).get("nodeName"),
+        "phase": (pod.get("status") or {}).get("phase"),
+        "restart_count": _restart_count(pod),
+        "reason": _reason(pod),
+        "raw": {
+            "labels": meta.get("labels") or {},
+            "owner_refs": meta.get("ownerReferences") or [],
+        },
+    }
+
+def event_row(ev: dict, cluster: str = None) -> dict:
+    meta = ev.get("metadata") or {}
+    involved = ev.get("involvedObject") or {}
+    ns = meta.get("namespace") or "default"
+    # Events recorded through events.k8s.io leave the legacy fields empty and use eventTime / series instead
+    series = ev.get("series") or {}
+    first = ev.get("firstTimestamp") or ev.get("eventTime")
+    last = ev.get("lastTimestamp") or series.get("lastObservedTime") or first
+    return {
+        # Event names are only unique within a cluster
+        "id": f"{cluster}:{ns}:{meta.get('name')}" if cluster else f"{ns}:{meta.get('name')}",
+        "cluster": cluster,
+        "namespace": ns,
+        "name": meta.get("name"),
+        "type": ev.get("type"),
+        "reason": ev.get("reason"),
+        "message": ev.get("message"),
+        "involved_kind": involved.get("kind"),
+        "involved_name": involved.get("name"),
+        "first_timestamp": parse_dt(first),
+        "last_timestamp": parse_dt(last),
+        "count": int(ev.get("count") or series.get("count") or 1),
+        "raw": ev,
+    }
+
+# A new history row is only written (in delta mode) when one of these changes
+STATE_FIELDS = ("restart_count", "phase", "reason", "node")
+
+def pod_state_id(row: dict) -> str:
+    return f"{row['cluster'] or ''}:{row['namespace']}:{row['pod']}"
+
+def insert_pod_rows(db, rows: list) -> int:
+    if rows:
+        db.execute(insert(K8sPodSnapshot.__table__), rows)
+    return len(rows)
+
+def record_pod_states(db, rows: list) -> int:
+    """Upsert current pod states and append snapshots only for pods whose state changed. Returns snapshots added."""
+    rows = list({pod_state_id(r): r for r in rows}.values())
+    if not rows:
+        return 0
+    states = K8sPodState.__table__
+    ids = [pod_state_id(r) for r in rows]
+    current = {
+        sid: tuple(rest)
+        for sid, *rest in db.execute(
+            select(states.c.id, *[states.c[f] for f in STATE_FIELDS]).where(states.c.id.in_(ids), states.c.deleted_at.is_(None))
+        )
+    }
+    changed = [r for sid, r in zip(ids, rows) if current.get(sid) != tuple(r[f] for f in STATE_FIELDS)]
+    insert_pod_rows(db, changed)
+
+    stmt = insert(states)
+    tracked = tuple_(*[states.c[f] for f in STATE_FIELDS])
+    incoming = tuple_(*[stmt.excluded[f] for f in STATE_FIELDS])
+    # Decided in SQL rather than from `changed`, so concurrent writers (ingest + watch) stay consistent
+    is_change = or_(tracked.is_distinct_from(incoming), states.c.deleted_at.is_not(None))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={
+            **{f: stmt.excluded[f] for f in STATE_FIELDS},
+            "raw": stmt.excluded.raw,
+            "last_seen_at": func.now(),
+            "changed_at": case((is_change, func.now()), else_=states.c.changed_at),
+            "deleted_at": None,
+        },
+    )
+    db.execute(stmt, [
+        {"id": sid, "cluster": r["cluster"], "namespace": r["namespace"], "pod": r["pod"], "raw": r["raw"],
+         **{f: r[f] for f in STATE_FIELDS}}
+        for sid, r in zip(ids, rows)
+    ])
+    return len(changed)
+
+def write_pod_rows(db, rows: list) -> int:
+    if settings.K8S_SNAPSHOT_MODE == "delta":
+        return record_pod_states(db, rows)
+    return insert_pod_rows(db, rows)
+
+def _mark_deleted(db, stmt) -> int:
+    """Run an UPDATE selecting live pod states, mark them deleted and log a tombstone snapshot for each."""
+    states = K8sPodState.__table__
+    gone = db.execute(
+        stmt.values(deleted_at=func.now(), changed_at=func.now())
+        .returning(states.c.cluster, states.c.namespace, states.c.pod, *[states.c[f] for f in STATE_FIELDS])
+    ).mappings().all()
+    # The change log must record the deletion too, or "state as of T" revives a pod that was later recreated
+    insert_pod_rows(db, [{"id": str(uuid.uuid4()), **g, "raw": {}, "deleted": True} for g in gone])
+    return len(gone)
+
+def delete_pod_states(db, rows: list) -> int:
+    """Mark pods as gone (watch DELETED events); only meaningful in delta mode."""
+    if settings.K8S_SNAPSHOT_MODE != "delta" or not rows:
+        return 0
+    ids = list({pod_state_id(r) for r in rows})
+    states = K8sPodState.__table__
+    return _mark_deleted(db, update(states).where(states.c.id.in_(ids), states.c.deleted_at.is_(None)))
+
+def mark_missing_pods_deleted(db, cluster, seen_since, ns_allow) -> int:
+    # After a full list, any live state not refreshed by it belongs to a pod that no longer exists.
+    # Not with a pod selector: a pod that stops matching it (e.g. its phase changed) is missing but still exists.
+    if settings.K8S_POD_LABEL_SELECTOR or settings.K8S_POD_FIELD_SELECTOR:
+        return 0
+    states = K8sPodState.__table__
+    stmt = update(states).where(
+        states.c.cluster.is_not_distinct_from(cluster),
+        states.c.deleted_at.is_(None),
+        states.c.last_seen_at < seen_since,
+    )
+    if ns_allow:
+        stmt = stmt.where(states.c.namespace.in_(ns_allow))
+    return _mark_deleted(db, stmt)
+
+def upsert_event_rows(db, rows: list) -> int:
+    # ON CONFLICT cannot touch the same row twice in one statement, so keep the latest copy of each event
+    rows = list({r["id"]: r for r in rows}.values())
+    if not rows:
+        return 0
+    stmt = insert(K8sEvent.__table__)
+    update_cols = {k: stmt.excluded[k] for k in rows[0].keys() if k != "id"}
+    # Repeats of an event update the same row; restamping it lets detector checkpoints see the change
+    update_cols["ingested_at"] = func.now()
+    db.execute(stmt.on_conflict_do_update(index_elements=["id"], set_=update_cols), rows)
+    return len(rows)
+
+def _ingest_chunks(v1, list_fn: str, build, write, max_items: int = 0, **kwargs):
+    # One list page at a time: build rows, write them, commit, move on. Returns (seen, written).
+    seen = written = 0
+    with SessionLocal() as db:
+        for items, _ in iter_list_chunks(v1, list_fn, **kwargs):
+            rows = [build(i) for i in items]
+            if max_items:
+                rows = rows[:max_items - seen]
+            written += write(db, rows)
+            db.commit()
+            seen += len(rows)
+            if max_items and seen >= max_items:
+                break
+    return seen, written
+
+def _ingest_kind(v1, kind: str, build, write, max_items: int = 0):
+    # One scope per namespace (or the whole cluster); namespaces are listed concurrently
+    scopes = list_scopes(kind)
+    if len(scopes) == 1:
+        list_fn, kwargs = scopes[0]
+        return _ingest_chunks(v1, list_fn, build, write, max_items, **kwargs)
+    seen = written = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.K8S_NAMESPACE_WORKERS, len(scopes)))) as pool:
+        futures = [pool.submit(_ingest_chunks, v1, list_fn, build, write, max_items, **kwargs) for list_fn, kwargs in scopes]
+        for fut in futures:
+            s, w = fut.result()
+            seen, written = seen + s, written + w
+    return seen, written
+
+def _ingest_cluster(context: str = None) -> dict:
+    v1 = load_client(context)
     if not v1:
         return {"status": "skipped", "reason": "Kubernetes client unavailable"}
-    ns_allow = namespace_filter()
+    cluster = cluster_name(context)
 
-    # Pods snapshot
-    pods = v1.list_pod_for_all_namespaces(watch=False)
-    pod_rows = 0
+    # Pods snapshot (every pod in append mode, only changed pods in delta mode)
     with SessionLocal() as db:
-        for pod in pods.items:
-            ns = pod.metadata.namespace
-            if ns_allow and ns not in ns_allow:
-                continue
-            row = {
-                "id": str(uuid.uuid4()),
-                "cluster": None,
-                "namespace": ns,
-                "pod": pod.metadata.name,
-                "node": pod.spec.node_name,
-                "phase": pod.status.phase,
-                "restart_count": _restart_count(pod),
-                "reason": _reason(pod),
-                "raw": {
-                    "labels": pod.metadata.labels or {},
-                    "owner_refs": [r.to_dict() for r in (pod.metadata.owner_references or [])],
-                },
-            }
-            db.execute(insert(K8sPodSnapshot).values(**row))
-            pod_rows += 1
-        db.commit()
+        list_started = db.scalar(select(func.now()))
+    pods_seen, pod_rows = _ingest_kind(v1, "pods", partial(pod_row, cluster=cluster), write_pod_rows)
+    pods_deleted = 0
+    if settings.K8S_SNAPSHOT_MODE == "delta":
+        with SessionLocal() as db:
+            pods_deleted = mark_missing_pods_deleted(db, cluster, list_started, namespace_filter())
+            db.commit()
 
     # Events upsert
-    ev_rows = 0
-    events = v1.list_event_for_all_namespaces(limit=settings.K8S_MAX_EVENTS)
-    with SessionLocal() as db:
-        for ev in events.items:
-            ns = ev.metadata.namespace or "default"
-            if ns_allow and ns not in ns_allow:
-                continue
-            ev_id = f"{ns}:{ev.metadata.name}"
-            row = {
-                "id": ev_id,
-                "cluster": None,
-                "namespace": ns,
-                "name": ev.metadata.name,
-                "type": ev.type,
-                "reason": ev.reason,
-                "message": ev.message,
-                "involved_kind": ev.involved_object.kind if ev.involved_object else None,
-                "involved_name": ev.involved_object.name if ev.involved_object else None,
-                "first_timestamp": getattr(ev, "first_timestamp", None),
-                "last_timestamp": getattr(ev, "last_timestamp", None),
-                "count": int(ev.count or 0),
-                "raw": ev.to_dict(),
-            }
-            stmt = insert(K8sEvent).values(**row)
-            update_cols = {k: stmt.excluded[k] for k in row.keys() if k != "id"}
-            db.execute(stmt.on_conflict_do_update(index_elements=[K8sEvent.id], set_=update_cols))
-            ev_rows += 1
-        db.commit()
-
-    return {"pod_snapshots_added": pod_rows, "events_upserted": ev_rows}
+    _, ev_rows = _ingest_kind(
+        v1, "events", partial(event_row, cluster=cluster), upsert_event_rows, settings.K8S_MAX_EVENTS
+    )
+
+    return {"pods_seen": pods_seen, "pod_snapshots_added": pod_rows, "pods_deleted": pods_deleted, "events_upserted": ev_rows}
+
+def _timed_ingest(context: str = None) -> dict:
+    started = time.perf_counter()
+    try:
+        result = _ingest_cluster(context)
+    except Exception as e:
+        logger.exception("K8s ingestion failed for cluster %s", context or "default")
+        result = {"status": "failed", "error": str(e)}
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+@celery_app.task
+def ingest_k8s():
+    """Ingest every cluster in K8S_CLUSTERS concurrently; a failing or slow cluster does not hold up the rest."""
+    contexts = cluster_contexts()
+    if contexts == [None]:
+        return _timed_ingest()
+
+    clusters = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.K8S_CLUSTER_WORKERS, len(contexts)))) as pool:
+        futures = {pool.submit(_timed_ingest, ctx): ctx for ctx in contexts}
+        for fut in as_completed(futures):
+            clusters[futures[fut]] = fut.result()
+
+    totals = {k: sum(r.get(k, 0) for r in clusters.values()) for k in ("pods_seen", "pod_snapshots_added", "pods_deleted", "events_upserted")}
+    return {
+        **totals,
+        "clusters_ok": sum(1 for r in clusters.values() if "status" not in r),
+        "clusters_failed": sorted(ctx for ctx, r in clusters.items() if r.get("status") == "failed"),
+        "clusters": clusters,
+    }
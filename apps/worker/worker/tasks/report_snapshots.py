@@ -0,0 +1,79 @@
+"""
+Precomputed responses for the dashboard report endpoints.
+
+run_detectors rewrites these in the same transaction as the findings they summarise, so the
+API serves a single-row read per poll instead of aggregating findings on every request. The
+payloads have the exact shape of GET /reports/weekly and GET /findings/trends/daily.
+"""
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from worker.celery_app import celery_app
+from worker.core.db import SessionLocal
+from worker.db_models import Finding, FindingDailyRollup, ReportSnapshot
+
+# Longest trend range served from the snapshot; longer or filtered requests are computed live
+TREND_SNAPSHOT_DAYS = 90
+
+def _daily_by_severity(db, start) -> dict:
+    r = FindingDailyRollup
+    q = select(r.day, r.severity, func.sum(r.findings)).where(r.day >= start).group_by(r.day, r.severity)
+    daily = {}
+    for day, sev, cnt in db.execute(q):
+        daily.setdefault(day, {})[int(sev)] = int(cnt)
+    return daily
+
+def trends_daily(db, today) -> list:
+    start = today - timedelta(days=TREND_SNAPSHOT_DAYS - 1)
+    daily = _daily_by_severity(db, start)
+    days = (start + timedelta(days=i) for i in range(TREND_SNAPSHOT_DAYS))
+    return [{"day": d.isoformat(), **{f"p{sev}": daily.get(d, {}).get(sev, 0) for sev in range(4)}} for d in days]
+
+def weekly(db, today) -> dict:
+    daily = _daily_by_severity(db, today - timedelta(days=6))
+    # Totals come from the last complete day; today's rollup only holds the runs so far
+    as_of = max((d for d in daily if d < today), default=max(daily, default=None))
+    severity_counts = daily.get(as_of, {})
+    top = db.execute(
+        select(Finding.id, Finding.severity, Finding.title, Finding.type)
+        .order_by(Finding.severity.asc(), Finding.created_at.desc())
+        .limit(10)
+    ).all()
+    return {
+        "summary": {
+            "total_findings": sum(severity_counts.values()),
+            "by_severity": {f"p{sev}": severity_counts.get(sev, 0) for sev in range(4)},
+            "as_of": as_of.isoformat() if as_of else None,
+        },
+        "daily": [
+            {"day": d.isoformat(), **{f"p{sev}": counts.get(sev, 0) for sev in range(4)}}
+            for d, counts in sorted(daily.items())
+        ],
+        "top_findings": [{"id": r.id, "severity": r.severity, "title": r.title, "type": r.type} for r in top],
+    }
+
+REPORTS = {
+    "weekly": weekly,
+    "trends_daily": trends_daily,
+}
+
+def refresh_report_snapshots(db) -> list:
+    """Recompute every report into report_snapshots (caller commits). Returns the names written."""
+    now = datetime.now(timezone.utc)
+    rows = [{"name": name, "payload": build(db, now.date()), "generated_at": now} for name, build in REPORTS.items()]
+    stmt = insert(ReportSnapshot.__table__)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"], set_={"payload": stmt.excluded.payload, "generated_at": stmt.excluded.generated_at}
+        ),
+        rows,
+    )
+    return list(REPORTS)
+
+@celery_app.task
+def refresh_reports():
+    """Rebuild the report snapshots outside a detector run (e.g. right after a migration)."""
+    with SessionLocal() as db:
+        names = refresh_report_snapshots(db)
+        db.commit()
+    return {"snapshots": names}
@@ -1,47 +1,208 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from psycopg2.errors import QueryCanceled
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import text, func, update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.dialects.postgresql import insert
 from worker.celery_app import celery_app
 from worker.core.db import SessionLocal
-from worker.db_models import Finding, RemediationAction, ActionStatus
-from worker.detectors.backlog_aging import BacklogAgingDetector
-from worker.detectors.crashloop_restarts import CrashLoopRestartsDetector
+from worker.core.config import settings
+from worker.db_models import Finding, FindingOccurrence, FindingDailyRollup, RemediationAction, ActionStatus
+from worker.detectors import enabled_detectors, detector_config, checkpoints
+from worker.tasks.report_snapshots import refresh_report_snapshots
 import uuid
 
-def _upsert_finding(db, f: dict):
-    # Extract proposed action if present
-    proposed_action = f.pop("proposed_action", None)
-    
-    stmt = insert(Finding).values(**f)
-    update_cols = {k: stmt.excluded[k] for k in f.keys() if k != "id"}
-    result = db.execute(stmt.on_conflict_do_update(constraint="uq_findings_type_fingerprint", set_=update_cols))
-    
-    # Create remediation action if proposed
-    if proposed_action:
-        # Only insert if doesn't exist (simple check by finding_id + action_type for now)
-        # TODO: Add proper status filter after fixing enum handling
-        existing = db.query(RemediationAction).filter(
-            RemediationAction.finding_id == f["id"],
-            RemediationAction.action_type == proposed_action["action_type"]
-        ).first()
-        
-        if not existing:
-            action = RemediationAction(
-                id=str(uuid.uuid4()),
-                finding_id=f["id"],
-                action_type=proposed_action["action_type"],
-                status=ActionStatus.PROPOSED,
-                title=proposed_action["title"],
-                description=proposed_action.get("description"),
-                params=proposed_action["params"]
-            )
-            db.add(action)
+logger = logging.getLogger(__name__)
+
+# Predicate of the partial unique index uq_remediation_actions_open: at most one action per
+# (finding, action type) still in flight. Literal, so ON CONFLICT can match it to the index.
+OPEN_ACTIONS = text("status IN ('proposed', 'approved', 'executing')")
+
+def _record_occurrences(db, rows: list, ids: dict) -> int:
+    """
+    Mark the findings in `rows` as seen today (UTC) and count first sightings of the day into
+    finding_daily_rollup. Returns the number of first sightings.
+    """
+    now = datetime.now(timezone.utc)
+    day = now.date()
+    o = FindingOccurrence.__table__
+    db.execute(
+        update(o)
+        .where(o.c.day == day, o.c.finding_id.in_(list(ids.values())))
+        .values(last_seen_at=now, runs=o.c.runs + 1)
+    )
+    occurrences = [
+        {"finding_id": ids[r["type"], r["fingerprint"]], "day": day, "type": r["type"], "severity": r["severity"],
+         "service_id": r.get("service_id") or "", "first_seen_at": now, "last_seen_at": now, "runs": 1}
+        for r in rows
+    ]
+    # Rows already there were updated above; RETURNING only yields the ones new today
+    stmt = insert(o).on_conflict_do_nothing(index_elements=["finding_id", "day"]).returning(o.c.type, o.c.severity, o.c.service_id)
+    new = Counter(tuple(r) for r in db.execute(stmt, occurrences))
+    if new:
+        stmt = insert(FindingDailyRollup.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "type", "severity", "service_id"],
+            set_={"findings": FindingDailyRollup.__table__.c.findings + stmt.excluded.findings},
+        )
+        db.execute(stmt, [
+            {"day": day, "type": t, "severity": sev, "service_id": svc, "findings": n}
+            for (t, sev, svc), n in new.items()
+        ])
+    return sum(new.values())
+
+def _upsert_findings(db, findings: list) -> dict:
+    """
+    Upsert all findings in one statement, propose their actions in another and record today's
+    occurrences.
+
+    Returns {"findings": n, "actions_proposed": n, "occurrences_new": n}.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement, so keep the last copy of each finding
+    findings = list({(f["type"], f["fingerprint"]): f for f in findings}.values())
+    if not findings:
+        return {"findings": 0, "actions_proposed": 0, "occurrences_new": 0}
+    proposed = {}
+    rows = []
+    for f in findings:
+        row = dict(f)
+        action = row.pop("proposed_action", None)
+        if action:
+            proposed[row["type"], row["fingerprint"]] = action
+        rows.append(row)
+
+    # executemany needs one column set, so rows are written in groups by the keys they carry. A key a
+    # detector left out then keeps its column default on insert and its stored value on conflict.
+    groups = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+    t = Finding.__table__
+    ids = {}
+    for columns, group in groups.items():
+        stmt = insert(t)
+        update_cols = {k: stmt.excluded[k] for k in columns if k not in ("id", "type", "fingerprint")}
+        update_cols["updated_at"] = func.now()
+        # RETURNING gives the id of the row actually written: the existing one when the finding was already known
+        stmt = stmt.on_conflict_do_update(constraint="uq_findings_type_fingerprint", set_=update_cols).returning(
+            t.c.id, t.c.type, t.c.fingerprint
+        )
+        ids.update({(ty, fp): id_ for id_, ty, fp in db.execute(stmt, group)})
+
+    actions = [
+        {
+            "id": str(uuid.uuid4()),
+            "finding_id": ids[key],
+            "action_type": a["action_type"],
+            "status": ActionStatus.PROPOSED,
+            "title": a["title"],
+            "description": a.get("description"),
+            "params": a["params"],
+        }
+        for key, a in proposed.items()
+    ]
+    actions_proposed = 0
+    if actions:
+        t = RemediationAction.__table__
+        stmt = insert(t)
+        # An open action already exists: refresh it while it is only proposed, never once it was approved
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["finding_id", "action_type"],
+            index_where=OPEN_ACTIONS,
+            set_={"title": stmt.excluded.title, "description": stmt.excluded.description, "params": stmt.excluded.params},
+            where=t.c.status == ActionStatus.PROPOSED,
+        ).returning(t.c.id)
+        # Only rows inserted or refreshed come back; an open action past "proposed" is left alone and not counted
+        actions_proposed = len(db.execute(stmt, actions).all())
+    occurrences_new = _record_occurrences(db, rows, ids)
+    return {"findings": len(rows), "actions_proposed": actions_proposed, "occurrences_new": occurrences_new}
+
+def _run_detector(cls, config: dict, timeout: float, started: dict, full: bool):
+    # Own session per detector; statement_timeout bounds the queries so a slow detector gives up server-side too
+    started[cls.name] = time.monotonic()
+    with SessionLocal() as db:
+        if timeout:
+            # LOCAL: scoped to this transaction, so the pooled connection doesn't keep it
+            db.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+        run_plan = checkpoints.plan(db, cls, config, full=full)
+        findings = [] if run_plan["mode"] == "skip" else cls(db, config, scopes=run_plan["scopes"]).run()
+        db.rollback()
+    return findings, run_plan, time.monotonic() - started[cls.name]
+
+def _wait(fut, name: str, timeout: float, started: dict) -> bool:
+    # The clock starts when the detector starts running, not while it is queued behind others
+    while not fut.done():
+        began = started.get(name)
+        if timeout and began is not None and time.monotonic() - began > timeout:
+            return False
+        wait([fut], timeout=0.2)
+    return True
 
 @celery_app.task
-def run_detectors():
-    upserted = 0
+def run_detectors(full: bool = False):
+    """
+    Run every enabled detector in parallel, then upsert their findings (and advance their
+    checkpoints) in one transaction. Detectors with nothing new since their checkpoint are
+    skipped; full=True ignores the checkpoints.
+    """
+    detectors = enabled_detectors()
+    report = {}
+    results = []
+    plans = {}
+    started = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(settings.DETECTOR_WORKERS, len(detectors))), thread_name_prefix="detector")
+    try:
+        futures = {}
+        for name, cls in detectors.items():
+            config = detector_config(name)
+            timeout = float(config.get("timeout_seconds", settings.DETECTOR_TIMEOUT_SECONDS))
+            futures[name] = (pool.submit(_run_detector, cls, config, timeout, started, full), timeout)
+        for name, (fut, timeout) in futures.items():
+            if not _wait(fut, name, timeout, started):
+                logger.warning("Detector %s timed out after %.0fs", name, timeout)
+                report[name] = {"status": "timeout", "seconds": timeout}
+                continue
+            try:
+                findings, run_plan, seconds = fut.result()
+            except OperationalError as e:
+                if isinstance(e.orig, QueryCanceled):
+                    logger.warning("Detector %s hit statement_timeout (%.0fs)", name, timeout)
+                    report[name] = {"status": "timeout", "seconds": timeout}
+                else:
+                    logger.exception("Detector %s failed", name)
+                    report[name] = {"status": "failed", "error": str(e.orig)}
+                continue
+            except Exception as e:
+                logger.exception("Detector %s failed", name)
+                report[name] = {"status": "failed", "error": str(e)}
+                continue
+            report[name] = {
+                "status": "skipped" if run_plan["mode"] == "skip" else "ok",
+                "mode": run_plan["mode"],
+                "scopes": len(run_plan["scopes"]) if run_plan["scopes"] is not None else None,
+                "findings": len(findings),
+                "seconds": round(seconds, 3),
+            }
+            plans[name] = run_plan
+            results.extend(findings)
+    finally:
+        # Don't wait on timed-out detectors; their statement_timeout will end them
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    started = time.perf_counter()
     with SessionLocal() as db:
-        for detector in (BacklogAgingDetector(db), CrashLoopRestartsDetector(db)):
-            for f in detector.run():
-                _upsert_finding(db, f)
-                upserted += 1
+        written = _upsert_findings(db, results)
+        for name, run_plan in plans.items():
+            checkpoints.save(db, name, run_plan["mode"], run_plan["marks"])
+        # Dashboard reports are rebuilt in the same transaction, so they never lag the findings they describe
+        refresh_report_snapshots(db)
         db.commit()
-    return {"findings_upserted": upserted}
+    return {
+        "findings_upserted": written["findings"],
+        "actions_proposed": written["actions_proposed"],
+        "occurrences_new": written["occurrences_new"],
+        "write_seconds": round(time.perf_counter() - started, 3),
+        "detectors": report,
+    }
@@ -0,0 +1,171 @@
+"""
+Long-running watch ingestion for Kubernetes pods and events.
+
+Each resource in each cluster (K8S_CLUSTERS) is listed once to get a resourceVersion and
+then watched from there. Watch threads push rows onto a bounded queue; the calling thread
+drains it and writes micro-batches, flushing when a batch is full or
+K8S_WATCH_FLUSH_SECONDS have passed.
+A 410 Gone (resourceVersion too old) triggers a fresh list. In delta mode every completed pod
+list is followed by a sweep that marks pods it did not return as deleted, so pods removed while
+a watch was disconnected don't stay live forever.
+"""
+import logging
+import queue
+import threading
+import time
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
+from sqlalchemy import select, func
+from worker.core.db import SessionLocal
+from worker.core.config import settings
+from worker.connectors.k8s import load_client, cluster_contexts, cluster_name, list_scopes, iter_list_chunks
+from worker.tasks.ingest_k8s import (
+    pod_row, pod_state_id, event_row, write_pod_rows, delete_pod_states, mark_missing_pods_deleted, upsert_event_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+def _sweep_pods(db, lists: list) -> int:
+    """Mark pods missing from each completed list (cluster, list start, namespaces) as deleted."""
+    if settings.K8S_SNAPSHOT_MODE != "delta":
+        return 0
+    return sum(mark_missing_pods_deleted(db, cluster, started, namespaces) for cluster, started, namespaces in lists)
+
+RESOURCES = {
+    "pods": {"row": pod_row, "key": pod_state_id, "write": write_pod_rows, "delete": delete_pod_states, "sweep": _sweep_pods},
+    "events": {"row": event_row, "write": upsert_event_rows},
+}
+
+def _list(v1, list_fn: str, kwargs: dict, emit):
+    # Paged list; every chunk of one list shares the snapshot resourceVersion the watch resumes from
+    count, resource_version = 0, None
+    for items, rv in iter_list_chunks(v1, list_fn, **kwargs):
+        for obj in items:
+            emit(obj)
+        count += len(items)
+        resource_version = resource_version or rv
+    return count, resource_version
+
+def _watch_resource(v1, kind: str, scope: tuple, out: queue.Queue, stop: threading.Event, cluster: str = None):
+    build = RESOURCES[kind]["row"]
+    list_name, kwargs = scope
+    list_fn = getattr(v1, list_name)
+    label = "/".join(x for x in (cluster, kwargs.get("namespace"), kind) if x)
+
+    def emit(obj, op="write"):
+        out.put((kind, op, build(obj, cluster=cluster)))
+
+    resource_version = None
+    while not stop.is_set():
+        try:
+            if resource_version is None:
+                with SessionLocal() as db:
+                    started = db.scalar(select(func.now()))
+                count, resource_version = _list(v1, list_name, kwargs, emit)
+                logger.info("Listed %d %s at resourceVersion %s", count, label, resource_version)
+                if "sweep" in RESOURCES[kind]:
+                    # Queued behind the listed rows, so they are written before the sweep runs
+                    namespace = kwargs.get("namespace")
+                    out.put((kind, "sweep", (cluster, started, {namespace} if namespace else None)))
+            w = watch.Watch()
+            for ev in w.stream(
+                list_fn,
+                **kwargs,
+                resource_version=resource_version,
+                timeout_seconds=settings.K8S_WATCH_TIMEOUT_SECONDS,
+                allow_watch_bookmarks=True,
+            ):
+                obj = ev["raw_object"]
+                resource_version = (obj.get("metadata") or {}).get("resourceVersion") or resource_version
+                if ev["type"] in ("ADDED", "MODIFIED"):
+                    emit(obj)
+                elif ev["type"] == "DELETED" and "delete" in RESOURCES[kind]:
+                    emit(obj, "delete")
+                if stop.is_set():
+                    w.stop()
+        except ApiException as e:
+            if e.status == 410:
+                logger.info("Watch on %s expired (410 Gone), re-listing", label)
+                resource_version = None
+                continue
+            logger.warning("Watch on %s failed (%s), retrying", label, e)
+            stop.wait(settings.K8S_WATCH_RETRY_SECONDS)
+        except Exception as e:
+            logger.warning("Watch on %s failed (%s), retrying", label, e)
+            stop.wait(settings.K8S_WATCH_RETRY_SECONDS)
+
+def _flush(buffers: dict) -> dict:
+    """
+    Write each kind's buffered (op, row) pairs: writes first, then deletes whose key saw no later
+    write, then sweeps after completed lists.
+    """
+    written = {}
+    with SessionLocal() as db:
+        for kind, ops in buffers.items():
+            if not ops:
+                continue
+            spec = RESOURCES[kind]
+            writes = [row for op, row in ops if op == "write"]
+            deletes = []
+            if "delete" in spec:
+                # A pod deleted and recreated under the same name within one batch must end up live
+                last = {spec["key"](row): op for op, row in ops if op != "sweep"}
+                deletes = [row for op, row in ops if op == "delete" and last[spec["key"](row)] == "delete"]
+            sweeps = [row for op, row in ops if op == "sweep"]
+            if writes:
+                written[kind] = spec["write"](db, writes)
+            if deletes:
+                spec["delete"](db, deletes)
+            if sweeps:
+                spec["sweep"](db, sweeps)
+        db.commit()
+    for ops in buffers.values():
+        ops.clear()
+    return written
+
+def watch_k8s(max_seconds: float = None):
+    """Watch pods and events in every cluster until interrupted (or for max_seconds), writing changes in micro-batches."""
+    clients = {ctx: load_client(ctx) for ctx in cluster_contexts()}
+    clients = {ctx: v1 for ctx, v1 in clients.items() if v1}
+    if not clients:
+        return {"status": "skipped", "reason": "Kubernetes client unavailable"}
+    out = queue.Queue(maxsize=settings.K8S_WATCH_QUEUE_SIZE)
+    stop = threading.Event()
+    for ctx, v1 in clients.items():
+        cluster = cluster_name(ctx)
+        # One watch per kind per namespace in K8S_NAMESPACE_FILTER (or one cluster-wide watch)
+        for kind in RESOURCES:
+            for scope in list_scopes(kind):
+                threading.Thread(
+                    target=_watch_resource, args=(v1, kind, scope, out, stop, cluster),
+                    name=f"watch-{ctx or 'default'}-{scope[1].get('namespace', 'all')}-{kind}", daemon=True,
+                ).start()
+
+    # One ordered buffer per kind, so _flush can tell which operation on a key came last
+    buffers = {kind: [] for kind in RESOURCES}
+    totals = {kind: 0 for kind in RESOURCES}
+    started = time.monotonic()
+    oldest = None
+    try:
+        while max_seconds is None or time.monotonic() - started < max_seconds:
+            try:
+                kind, op, row = out.get(timeout=0.5)
+                buffers[kind].append((op, row))
+                oldest = oldest or time.monotonic()
+            except queue.Empty:
+                pass
+            pending = sum(len(ops) for ops in buffers.values())
+            if pending and (pending >= settings.K8S_WATCH_BATCH_SIZE or time.monotonic() - oldest >= settings.K8S_WATCH_FLUSH_SECONDS):
+                for kind, n in _flush(buffers).items():
+                    totals[kind] += n
+                oldest = None
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for _ in range(out.qsize()):
+            kind, op, row = out.get_nowait()
+            buffers[kind].append((op, row))
+        for kind, n in _flush(buffers).items():
+            totals[kind] += n
+    return {"pod_snapshots_added": totals["pods"], "events_upserted": totals["events"]}